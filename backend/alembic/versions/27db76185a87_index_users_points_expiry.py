@@ -0,0 +1,36 @@
+"""Partial index on users.points_expiry for expiring-soon lookups
+
+Revision ID: 27db76185a87
+Revises: a4339f82cd33
+Create Date: 2026-10-19 12:05:48.302917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '27db76185a87'
+down_revision: Union[str, Sequence[str], None] = 'a4339f82cd33'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The initial migration predates points_expiry; databases built from the
+    # models already have it, a fresh `alembic upgrade head` does not
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS points_expiry TIMESTAMP WITH TIME ZONE")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_points_expiry_active', 'users', ['points_expiry', 'id'],
+            unique=False, postgresql_where=sa.text('current_points > 0'), postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_points_expiry_active', table_name='users', postgresql_concurrently=True)
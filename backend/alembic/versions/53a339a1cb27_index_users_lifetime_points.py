@@ -0,0 +1,33 @@
+"""Index users.lifetime_points for leaderboard and rank lookups
+
+Revision ID: 53a339a1cb27
+Revises: 079e4139c73e
+Create Date: 2026-10-19 10:02:17.448130
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '53a339a1cb27'
+down_revision: Union[str, Sequence[str], None] = '079e4139c73e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_lifetime_points_desc', 'users', [sa.text('lifetime_points DESC')],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_lifetime_points_desc', table_name='users', postgresql_concurrently=True)
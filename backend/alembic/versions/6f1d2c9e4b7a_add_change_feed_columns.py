@@ -0,0 +1,83 @@
+"""Add change_seq and change_xid for the /changes feed
+
+Revision ID: 6f1d2c9e4b7a
+Revises: 85eab6c01100
+Create Date: 2026-10-19 16:42:05.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f1d2c9e4b7a'
+down_revision: Union[str, Sequence[str], None] = '85eab6c01100'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FEED_TABLES = ('users', 'redemptions', 'point_transactions')
+FEED_COLUMNS = ('change_seq', 'change_xid')
+BACKFILL_BATCH = 10_000
+CURRENT_XID = "pg_current_xact_id()::text::bigint"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # None of these steps rewrites a table: adding a nullable column without a
+    # default is a catalog-only change. Both defaults are volatile, so they are
+    # only set afterwards, where they apply to new rows alone.
+    op.execute("CREATE SEQUENCE change_seq")
+    for table in FEED_TABLES:
+        op.add_column(table, sa.Column('change_seq', sa.BigInteger(), nullable=True))
+        op.add_column(table, sa.Column('change_xid', sa.BigInteger(), nullable=True))
+        # Before the backfill, so rows inserted meanwhile are never left NULL
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN change_seq SET DEFAULT nextval('change_seq')")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN change_xid SET DEFAULT {CURRENT_XID}")
+
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        for table in FEED_TABLES:
+            # Keyset batches on the primary key, each committed on its own
+            after = ''
+            while True:
+                last = bind.execute(
+                    sa.text(f"SELECT max(id) FROM (SELECT id FROM {table} WHERE id > :after ORDER BY id LIMIT :n) b"),
+                    {"after": after, "n": BACKFILL_BATCH},
+                ).scalar()
+                if last is None:
+                    break
+                bind.execute(
+                    sa.text(f"UPDATE {table} SET change_seq = nextval('change_seq'), change_xid = {CURRENT_XID} "
+                            "WHERE id > :after AND id <= :last AND change_seq IS NULL"),
+                    {"after": after, "last": last},
+                )
+                after = last
+
+        for table in FEED_TABLES:
+            op.create_index(f'ix_{table}_store_change_xid', table, ['store_id', 'change_xid', 'change_seq'], unique=False, postgresql_concurrently=True)
+        for table in ('redemptions', 'point_transactions'):
+            op.create_index(f'ix_{table}_user_change_xid', table, ['user_id', 'change_xid', 'change_seq'], unique=False, postgresql_concurrently=True)
+
+        # A validated CHECK lets SET NOT NULL skip its scan under ACCESS EXCLUSIVE;
+        # VALIDATE itself only takes SHARE UPDATE EXCLUSIVE
+        for table in FEED_TABLES:
+            for column in FEED_COLUMNS:
+                op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_not_null CHECK ({column} IS NOT NULL) NOT VALID")
+                op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_{column}_not_null")
+                op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+                op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {table}_{column}_not_null")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in ('point_transactions', 'redemptions'):
+            op.drop_index(f'ix_{table}_user_change_xid', table_name=table, postgresql_concurrently=True)
+        for table in FEED_TABLES:
+            op.drop_index(f'ix_{table}_store_change_xid', table_name=table, postgresql_concurrently=True)
+    for table in FEED_TABLES:
+        op.drop_column(table, 'change_xid')
+        op.drop_column(table, 'change_seq')
+    op.execute("DROP SEQUENCE change_seq")
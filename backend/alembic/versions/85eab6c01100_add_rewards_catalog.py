@@ -0,0 +1,64 @@
+"""Move the rewards catalog into a table
+
+Revision ID: 85eab6c01100
+Revises: a18fb8b5794d
+Create Date: 2026-10-19 14:08:12.637190
+
+"""
+from typing import Sequence, Union
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '85eab6c01100'
+down_revision: Union[str, Sequence[str], None] = 'a18fb8b5794d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The catalog previously hard-coded as REWARDS_CATALOG in server.py
+SEED_REWARDS = [
+    ("reward_1", "10% Off Voucher", "Get 10% off on your next purchase", 200, 1,
+     "https://images.unsplash.com/photo-1556742049-0cfed4f6a45d?w=400&q=80"),
+    ("reward_2", "Free Triangle Waffle", "A delicious crispy triangle waffle", 400, 2,
+     "https://images.unsplash.com/photo-1600713531223-aab27a01bb69?w=400&q=80"),
+    ("reward_3", "Popsicle Waffle", "Waffle on a stick - perfect for on-the-go!", 500, 3,
+     "https://images.unsplash.com/photo-1740072625684-46f4f1f594d8?w=400&q=80"),
+    ("reward_4", "6pc Pancake Stack", "Six fluffy pancakes with your choice of topping", 600, 4,
+     "https://images.unsplash.com/photo-1575831967553-771b0db4f7c1?w=400&q=80"),
+    ("reward_5", "Premium Choice", "Choice of any Waffle OR 10pc Pancake", 800, 5,
+     "https://images.unsplash.com/photo-1567620905732-2d1ec7ab7445?w=400&q=80"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    rewards = op.create_table('rewards',
+    sa.Column('id', sa.String(length=50), nullable=False),
+    sa.Column('store_id', sa.String(length=50), server_default='main', nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('points_required', sa.Integer(), nullable=False),
+    sa.Column('tier', sa.Integer(), nullable=False),
+    sa.Column('image_url', sa.Text(), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=True),
+    sa.Column('active', sa.Boolean(), server_default='true', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id']),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_rewards_store_tier', 'rewards', ['store_id', 'tier'], unique=False)
+    now = datetime.now(timezone.utc)
+    op.bulk_insert(rewards, [
+        {"id": id_, "store_id": "main", "name": name, "description": description,
+         "points_required": points, "tier": tier, "image_url": image_url, "updated_at": now}
+        for id_, name, description, points, tier, image_url in SEED_REWARDS
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rewards_store_tier', table_name='rewards')
+    op.drop_table('rewards')
@@ -0,0 +1,93 @@
+"""Add stores and store-scoped columns and indexes
+
+Revision ID: a18fb8b5794d
+Revises: 27db76185a87
+Create Date: 2026-10-19 13:16:30.570241
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a18fb8b5794d'
+down_revision: Union[str, Sequence[str], None] = '27db76185a87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STORE_SCOPED_TABLES = ['users', 'redemptions', 'point_transactions', 'user_period_points', 'daily_active_customers']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    stores = op.create_table('stores',
+    sa.Column('id', sa.String(length=50), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Existing rows all belong to the original shop
+    op.bulk_insert(stores, [{'id': 'main', 'name': 'The Waffle Pop Co'}])
+
+    for table in STORE_SCOPED_TABLES + ['daily_stats', 'daily_reward_stats']:
+        op.add_column(table, sa.Column('store_id', sa.String(length=50), server_default='main', nullable=False))
+        op.create_foreign_key(f'{table}_store_id_fkey', table, 'stores', ['store_id'], ['id'])
+
+    op.drop_constraint('daily_stats_pkey', 'daily_stats', type_='primary')
+    op.create_primary_key('daily_stats_pkey', 'daily_stats', ['store_id', 'day'])
+    op.drop_constraint('daily_reward_stats_pkey', 'daily_reward_stats', type_='primary')
+    op.create_primary_key('daily_reward_stats_pkey', 'daily_reward_stats', ['store_id', 'day', 'reward_id'])
+
+    op.drop_index('ix_user_period_points_top', table_name='user_period_points')
+    op.create_index('ix_user_period_points_top', 'user_period_points', ['store_id', 'period', 'period_start', sa.text('points DESC')], unique=False)
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_store_lower_name', 'users', ['store_id', sa.text('lower(name)')], unique=True, postgresql_concurrently=True)
+        op.create_index('ix_users_store_name', 'users', ['store_id', 'name'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_users_store_lifetime_points', 'users', ['store_id', sa.text('lifetime_points DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index(
+            'ix_users_store_points_expiry_active', 'users', ['store_id', 'points_expiry', 'id'],
+            unique=False, postgresql_where=sa.text('current_points > 0'), postgresql_concurrently=True,
+        )
+        op.create_index('ix_redemptions_store_created_at', 'redemptions', ['store_id', sa.text('created_at DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_point_transactions_store_created_at', 'point_transactions', ['store_id', sa.text('created_at DESC')], unique=False, postgresql_concurrently=True)
+
+        op.drop_index('ix_users_name', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_lifetime_points_desc', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_points_expiry_active', table_name='users', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_points_expiry_active', 'users', ['points_expiry', 'id'], unique=False, postgresql_where=sa.text('current_points > 0'), postgresql_concurrently=True)
+        op.create_index('ix_users_lifetime_points_desc', 'users', [sa.text('lifetime_points DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_users_name', 'users', ['name'], unique=True, postgresql_concurrently=True)
+
+        op.drop_index('ix_point_transactions_store_created_at', table_name='point_transactions', postgresql_concurrently=True)
+        op.drop_index('ix_redemptions_store_created_at', table_name='redemptions', postgresql_concurrently=True)
+        op.drop_index('ix_users_store_points_expiry_active', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_store_lifetime_points', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_store_name', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_store_lower_name', table_name='users', postgresql_concurrently=True)
+
+    op.drop_index('ix_user_period_points_top', table_name='user_period_points')
+    op.create_index('ix_user_period_points_top', 'user_period_points', ['period', 'period_start', sa.text('points DESC')], unique=False)
+
+    # Per-store rows would collide once store_id is gone; the daily rollup job
+    # rebuilds them from the ledger after the watermark reset.
+    op.execute("DELETE FROM daily_stats")
+    op.execute("DELETE FROM daily_reward_stats")
+    op.execute("DELETE FROM daily_active_customers")
+    op.execute("DELETE FROM rollup_watermarks")
+    op.drop_constraint('daily_reward_stats_pkey', 'daily_reward_stats', type_='primary')
+    op.drop_constraint('daily_stats_pkey', 'daily_stats', type_='primary')
+    for table in STORE_SCOPED_TABLES + ['daily_stats', 'daily_reward_stats']:
+        op.drop_constraint(f'{table}_store_id_fkey', table, type_='foreignkey')
+        op.drop_column(table, 'store_id')
+    op.create_primary_key('daily_stats_pkey', 'daily_stats', ['day'])
+    op.create_primary_key('daily_reward_stats_pkey', 'daily_reward_stats', ['day', 'reward_id'])
+
+    op.drop_table('stores')
@@ -0,0 +1,62 @@
+"""Add daily analytics rollups and created_at indexes
+
+Revision ID: a4339f82cd33
+Revises: cebb04ec594b
+Create Date: 2026-10-19 11:27:03.881642
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4339f82cd33'
+down_revision: Union[str, Sequence[str], None] = 'cebb04ec594b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('points_issued', sa.Integer(), nullable=False),
+    sa.Column('points_spent', sa.Integer(), nullable=False),
+    sa.Column('redemptions', sa.Integer(), nullable=False),
+    sa.Column('active_customers', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('daily_reward_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('reward_id', sa.String(length=50), nullable=False),
+    sa.Column('redemptions', sa.Integer(), nullable=False),
+    sa.Column('points_spent', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'reward_id')
+    )
+    op.create_table('daily_active_customers',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'user_id')
+    )
+    op.create_table('rollup_watermarks',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('high_water', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_point_transactions_created_at'), 'point_transactions', ['created_at'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_redemptions_created_at'), 'redemptions', ['created_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_redemptions_created_at'), table_name='redemptions', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_point_transactions_created_at'), table_name='point_transactions', postgresql_concurrently=True)
+    op.drop_table('rollup_watermarks')
+    op.drop_table('daily_active_customers')
+    op.drop_table('daily_reward_stats')
+    op.drop_table('daily_stats')
@@ -0,0 +1,38 @@
+"""Add user_period_points rollup for weekly/monthly leaderboards
+
+Revision ID: cebb04ec594b
+Revises: 53a339a1cb27
+Create Date: 2026-10-19 10:41:55.019374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cebb04ec594b'
+down_revision: Union[str, Sequence[str], None] = '53a339a1cb27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_period_points',
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('period', 'period_start', 'user_id')
+    )
+    op.create_index('ix_user_period_points_top', 'user_period_points', ['period', 'period_start', sa.text('points DESC')], unique=False)
+    # Backfill from the ledger afterwards with: python rebuild_rollups.py
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_period_points_top', table_name='user_period_points')
+    op.drop_table('user_period_points')
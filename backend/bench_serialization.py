@@ -0,0 +1,101 @@
+import json
+import time
+import uuid
+import random
+import argparse
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from models import User
+from serialization import USER_COLUMNS, encode_json, user_payload
+from server import UserResponse
+
+# Rows/sec for the /users list, old path against new:
+#     python bench_serialization.py                  # 100k users built in memory
+#     python bench_serialization.py --database-url postgresql://localhost/waffle
+# old: User ORM objects -> UserResponse.from_user per row -> FastAPI's JSON encoding
+# new: USER_COLUMNS rows -> user_payload with one `now` -> orjson
+# With a database URL the timings include fetching the store's users, so ORM
+# hydration is measured too; point it at data from generate_data.py.
+
+UserRow = namedtuple("UserRow", [c.key for c in USER_COLUMNS])
+
+def old_encode(users) -> bytes:
+    # What FastAPI did for a returned list of models without a response_model
+    return json.dumps(
+        jsonable_encoder([UserResponse.from_user(u) for u in users]),
+        ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+    ).encode("utf-8")
+
+def new_encode(rows) -> bytes:
+    now = datetime.now(timezone.utc)
+    return encode_json([user_payload(row, now) for row in rows])
+
+def synthetic_users(count: int, seed: int):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(count):
+        points = rng.randint(0, 2000)
+        rows.append(UserRow(
+            id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            store_id="main",
+            name=f"Customer {i:08d}",
+            current_points=points,
+            lifetime_points=points + rng.randint(0, 5000),
+            created_at=now - timedelta(seconds=rng.uniform(0, 365 * 86400)),
+            points_expiry=now + timedelta(days=rng.uniform(-30, 90)),
+        ))
+    return rows
+
+def timed(label: str, count: int, fn) -> float:
+    start = time.perf_counter()
+    body = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:8} {count / elapsed:>12,.0f} rows/sec  {elapsed * 1000:>9.1f} ms  {len(body):>12,} bytes")
+    return elapsed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark user list serialization")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="fetch the users from this database instead")
+    parser.add_argument("--store", default="main")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+        query = select(User).where(User.store_id == args.store).order_by(User.name).limit(args.users)
+        column_query = select(*USER_COLUMNS).where(User.store_id == args.store).order_by(User.name).limit(args.users)
+
+        def old():
+            with Session(engine) as session:
+                return old_encode(session.execute(query).scalars().all())
+
+        def new():
+            with engine.connect() as conn:
+                return new_encode(conn.execute(column_query).all())
+
+        with engine.connect() as conn:
+            count = len(conn.execute(column_query).all())
+    else:
+        rows = synthetic_users(args.users, args.seed)
+        orm_users = [User(**row._asdict()) for row in rows]
+        count = len(rows)
+
+        def old():
+            return old_encode(orm_users)
+
+        def new():
+            return new_encode(rows)
+
+    before = timed("old", count, old)
+    after = timed("new", count, new)
+    print(f"speedup  {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Reward
+
+@dataclass
+class _Entry:
+    stamp: Tuple
+    rewards: List[Row]
+    by_id: Dict[str, Row] = field(default_factory=dict)
+    checked_at: float = 0.0
+
+class CatalogCache:
+    # Per-store active rewards, held in memory. Edits made through this process
+    # invalidate immediately. Edits and redemptions from other workers are
+    # picked up within `ttl` seconds: the (max(updated_at), count, sum(stock))
+    # stamp of the store's rows serves as the catalog version and is rechecked
+    # once the entry is older than ttl, and the catalog is reloaded only when
+    # the stamp changed. Redemptions still check stock in the database.
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, _Entry] = {}
+
+    async def _stamp(self, db: AsyncSession, store_id: str) -> Tuple:
+        result = await db.execute(
+            select(func.max(Reward.updated_at), func.count(), func.sum(Reward.stock)).where(Reward.store_id == store_id)
+        )
+        return tuple(result.one())
+
+    async def _entry(self, db: AsyncSession, store_id: str) -> _Entry:
+        entry = self._entries.get(store_id)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self.ttl:
+            return entry
+        stamp = await self._stamp(db, store_id)
+        if entry is None or entry.stamp != stamp:
+            # Plain rows rather than ORM objects, so no session can mutate what is shared
+            result = await db.execute(
+                select(*Reward.__table__.c)
+                .where(Reward.store_id == store_id, Reward.active.is_(True))
+                .order_by(Reward.tier, Reward.points_required, Reward.id)
+            )
+            rewards = list(result.all())
+            entry = _Entry(stamp=stamp, rewards=rewards, by_id={r.id: r for r in rewards})
+            self._entries[store_id] = entry
+        entry.checked_at = now
+        return entry
+
+    async def list(self, db: AsyncSession, store_id: str) -> List[Row]:
+        return (await self._entry(db, store_id)).rewards
+
+    async def get(self, db: AsyncSession, store_id: str, reward_id: str):
+        return (await self._entry(db, store_id)).by_id.get(reward_id)
+
+    def invalidate(self, store_id: str) -> None:
+        self._entries.pop(store_id, None)
@@ -0,0 +1,149 @@
+import zlib
+import functools
+
+from starlette.datastructures import Headers, MutableHeaders
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Sync flush so each streamed chunk reaches the client right away
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.compress(data) + self._c.flush()
+
+@functools.lru_cache(maxsize=None)
+def _brotli():
+    # Imported on the first request that accepts br, not at startup
+    try:
+        import brotli
+    except ImportError:  # brotli is optional; gzip alone still works
+        return None
+    return brotli
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._c = _brotli().Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+def accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+class CompressionMiddleware:
+    # Negotiated br/gzip for text-like responses, pure ASGI so streamed bodies
+    # (the CSV export) are compressed chunk by chunk rather than buffered.
+    # Single-message bodies under minimum_size go out untouched. The default
+    # levels favour CPU over ratio for small instances; JSON still shrinks
+    # several times at these levels.
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 5, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if "br" in accepted and _brotli() is not None:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding, send).run(scope, receive)
+
+class _CompressedResponder:
+    def __init__(self, config: CompressionMiddleware, encoding: str, send):
+        self.config = config
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def run(self, scope, receive):
+        await self.config.app(scope, receive, self.send_wrapper)
+
+    def _new_compressor(self):
+        if self.encoding == "br":
+            return _Brotli(self.config.brotli_quality)
+        return _Gzip(self.config.gzip_level)
+
+    def _start_compressed(self):
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["Content-Length"]
+        # A strong validator names exact bytes; these differ per encoding
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        self.compressor = self._new_compressor()
+
+    async def send_wrapper(self, message):
+        if message["type"] == "http.response.start":
+            # Held until the first body chunk shows whether compression pays off
+            self.start_message = {**message, "headers": list(message.get("headers", []))}
+            headers = Headers(raw=self.start_message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                message["status"] < 200
+                or message["status"] in (204, 304)
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if self.passthrough:
+                await self.send(self.start_message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body and len(body) < self.config.minimum_size:
+                await self.send(self.start_message)
+                await self.send(message)
+                self.passthrough = True
+                return
+            self._start_compressed()
+            if not more_body:
+                compressed = self.compressor.finish(body)
+                MutableHeaders(raw=self.start_message["headers"])["Content-Length"] = str(len(compressed))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            await self.send(self.start_message)
+
+        if more_body:
+            await self.send({"type": "http.response.body", "body": self.compressor.chunk(body), "more_body": True})
+        else:
+            await self.send({"type": "http.response.body", "body": self.compressor.finish(body)})
@@ -1,18 +1,25 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy import text
 from dotenv import load_dotenv
 from pathlib import Path
+import asyncio
 import os
 
 load_dotenv(Path(__file__).parent / '.env')
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
-ASYNC_DATABASE_URL = DATABASE_URL.replace('postgresql://', 'postgresql+asyncpg://')
 
+# serve.py splits DB_CONNECTION_BUDGET across workers and sets these per process
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '5'))
+
+# Scripts that only build statements from the models (plan_check.py,
+# generate_data.py) import this without DATABASE_URL; the app checks at startup
 engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    pool_size=10,
-    max_overflow=5,
+    DATABASE_URL.replace('postgresql://', 'postgresql+asyncpg://'),
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
     pool_timeout=30,
     pool_recycle=1800,
     pool_pre_ping=False,
@@ -21,7 +28,7 @@ engine = create_async_engine(
         "statement_cache_size": 0,  # Required for transaction pooler
         "command_timeout": 30,
     }
-)
+) if DATABASE_URL else None
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
@@ -39,3 +46,25 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+async def warm_pool(connections: int) -> None:
+    # Open the connections side by side so TLS and asyncpg setup overlap,
+    # then hand them all back to the pool idle.
+    connections = min(connections, engine.pool.size())
+    if connections <= 0:
+        return
+    opened = await asyncio.gather(
+        *(engine.connect() for _ in range(connections)), return_exceptions=True
+    )
+    live = [c for c in opened if not isinstance(c, BaseException)]
+    try:
+        await asyncio.gather(*(c.execute(text("SELECT 1")) for c in live))
+    finally:
+        await asyncio.gather(*(c.close() for c in live))
+    failed = [c for c in opened if isinstance(c, BaseException)]
+    if failed:
+        raise failed[0]
+
+async def ping_database() -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
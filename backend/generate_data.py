@@ -0,0 +1,187 @@
+import io
+import os
+import sys
+import uuid
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+from rollups import REBUILD_PERIOD_POINTS_SQL, DAILY_ROLLUP_SQL, DAILY_WATERMARK, EPOCH, daily_rollup_params
+
+# Deterministic synthetic data for load and query-plan testing:
+#     python generate_data.py --users 1000000 --transactions 20000000 --truncate
+# The same seed, volumes and --end give identical tables. Rows go in through COPY,
+# then balances, rollups and planner statistics are derived from the ledger.
+
+load_dotenv(Path(__file__).parent / '.env')
+
+COPY_BATCH = 50_000
+HISTORY_DAYS = 365
+REWARDS = [("reward_1", "10% Off Voucher", 200), ("reward_2", "Free Triangle Waffle", 400),
+           ("reward_3", "Popsicle Waffle", 500), ("reward_4", "6pc Pancake Stack", 600),
+           ("reward_5", "Premium Choice", 800)]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic users, transactions and redemptions")
+    parser.add_argument("--database-url", default=os.environ.get('DATABASE_URL'))
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--transactions", type=int, default=2_000_000)
+    parser.add_argument("--redemptions", type=int, default=200_000)
+    parser.add_argument("--stores", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None,
+                        help="timestamp the history ends at (default: now), e.g. 2026-01-01T00:00:00+00:00")
+    parser.add_argument("--truncate", action="store_true", help="empty the tables first")
+    parser.add_argument("--allow-remote", action="store_true", help="permit a non-local database host")
+    return parser.parse_args()
+
+def store_ids(count: int):
+    return ["main"] + [f"store_{i}" for i in range(2, count + 1)]
+
+def copy_rows(cursor, table: str, columns, rows) -> None:
+    # Tab-separated COPY in fixed-size chunks; values never contain tabs or newlines
+    buffer = io.StringIO()
+    pending = 0
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    for row in rows:
+        buffer.write("\t".join("\\N" if v is None else str(v) for v in row))
+        buffer.write("\n")
+        pending += 1
+        if pending == COPY_BATCH:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            buffer = io.StringIO()
+            pending = 0
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+
+def main() -> None:
+    args = parse_args()
+    if not args.database_url:
+        sys.exit("DATABASE_URL is not set")
+    host = urlparse(args.database_url).hostname or "localhost"
+    if host not in ("localhost", "127.0.0.1", "::1") and not args.allow_remote:
+        sys.exit(f"Refusing to load synthetic data into {host}; pass --allow-remote if you mean it")
+
+    rng = random.Random(args.seed)
+    now = args.end or datetime.now(timezone.utc)
+    start = now - timedelta(days=HISTORY_DAYS)
+    history_seconds = HISTORY_DAYS * 86400
+    stores = store_ids(args.stores)
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(args.users)]
+
+    def user_name(i: int) -> str:
+        return f"Customer {i:08d}"
+
+    def at(offset: float) -> str:
+        return (start + timedelta(seconds=offset)).isoformat()
+
+    engine = create_engine(args.database_url)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if args.truncate:
+            cursor.execute(
+                "TRUNCATE point_transactions, redemptions, user_period_points, daily_stats, "
+                "daily_reward_stats, daily_active_customers, rollup_watermarks, users CASCADE"
+            )
+        for store in stores:
+            cursor.execute(
+                "INSERT INTO stores (id, name) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                (store, f"Synthetic {store}"),
+            )
+
+        print(f"users: {args.users}")
+        joined = [rng.uniform(0, history_seconds) for _ in range(args.users)]
+        copy_rows(cursor, "users",
+                  ["id", "store_id", "name", "current_points", "lifetime_points", "created_at", "version"],
+                  ((user_ids[i], stores[i % len(stores)], user_name(i), 0, 0, at(joined[i]), 1)
+                   for i in range(args.users)))
+
+        print(f"point_transactions: {args.transactions}")
+
+        # Half the visits come from the 5% of customers who are regulars
+        regulars = max(args.users // 20, 1)
+
+        def transactions():
+            for _ in range(args.transactions):
+                i = rng.randrange(regulars) if rng.random() < 0.5 else rng.randrange(args.users)
+                earned = rng.random() < 0.8
+                yield (
+                    str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                    stores[i % len(stores)], user_ids[i], user_name(i),
+                    rng.randint(10, 200) if earned else rng.randint(20, 100),
+                    "Purchase" if earned else "Adjustment",
+                    "earned" if earned else "spent",
+                    at(rng.uniform(joined[i], history_seconds)),
+                )
+        copy_rows(cursor, "point_transactions",
+                  ["id", "store_id", "user_id", "user_name", "points", "reason", "transaction_type", "created_at"],
+                  transactions())
+
+        print(f"redemptions: {args.redemptions}")
+
+        def redemptions():
+            for n in range(args.redemptions):
+                i = rng.randrange(args.users)
+                reward_id, reward_name, cost = rng.choice(REWARDS)
+                claimed = rng.random() < 0.9
+                created = rng.uniform(joined[i], history_seconds)
+                yield (
+                    str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                    stores[i % len(stores)], user_ids[i], user_name(i),
+                    reward_id, reward_name, cost, f"GEN-{n:09d}",
+                    "t" if claimed else "f", at(created),
+                    at(min(created + 3600, history_seconds)) if claimed else None,
+                )
+        copy_rows(cursor, "redemptions",
+                  ["id", "store_id", "user_id", "user_name", "reward_id", "reward_name", "points_spent",
+                   "reward_code", "claimed", "created_at", "claimed_at"],
+                  redemptions())
+        raw.commit()
+    finally:
+        raw.close()
+
+    print("deriving balances and rollups")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE users u SET
+                lifetime_points = a.earned,
+                current_points = greatest(a.earned - a.spent, 0),
+                points_expiry = a.last_earned + interval '90 days',
+                change_seq = nextval('change_seq'),
+                change_xid = pg_current_xact_id()::text::bigint
+            FROM (
+                SELECT user_id,
+                       coalesce(sum(points) FILTER (WHERE transaction_type = 'earned'), 0) AS earned,
+                       coalesce(sum(points) FILTER (WHERE transaction_type = 'spent'), 0) AS spent,
+                       max(created_at) FILTER (WHERE transaction_type = 'earned') AS last_earned
+                FROM point_transactions GROUP BY user_id
+            ) a
+            WHERE a.user_id = u.id
+        """))
+        for cmd in REBUILD_PERIOD_POINTS_SQL:
+            conn.execute(text(cmd))
+        for cmd in DAILY_ROLLUP_SQL:
+            conn.execute(text(cmd), daily_rollup_params(EPOCH.date()))
+        conn.execute(
+            text("""
+                INSERT INTO rollup_watermarks (name, high_water) VALUES (:name, :hi)
+                ON CONFLICT (name) DO UPDATE SET high_water = EXCLUDED.high_water
+            """),
+            {"name": DAILY_WATERMARK, "hi": now},
+        )
+
+    # Fresh visibility map and statistics, so plans match a settled production table
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE"))
+    print("✅ Synthetic data loaded")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import os
+import fcntl
+
+# One worker per host holds this lock and runs the background jobs. The lock
+# dies with its process, and the other workers keep trying, so another
+# worker takes over if the leader exits.
+LEADER_LOCK_FILE = os.environ.get('LEADER_LOCK_FILE', '/tmp/waffle-pop-leader.lock')
+
+_lock_fd = None
+
+def is_leader() -> bool:
+    global _lock_fd
+    if _lock_fd is not None:
+        return True
+    fd = os.open(LEADER_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _lock_fd = fd
+    return True
+
+def release_leadership() -> None:
+    global _lock_fd
+    if _lock_fd is None:
+        return
+    fcntl.flock(_lock_fd, fcntl.LOCK_UN)
+    os.close(_lock_fd)
+    _lock_fd = None
@@ -1,29 +1,101 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, Date, DateTime, ForeignKey, Text, Index, Sequence, func, literal_column, text
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime, timezone
 import uuid
 
+DEFAULT_STORE_ID = 'main'
+
 def generate_uuid():
     return str(uuid.uuid4())
 
+def store_id_column():
+    # Leading column of every store-scoped index below
+    return Column(
+        String(50), ForeignKey('stores.id'), nullable=False,
+        default=DEFAULT_STORE_ID, server_default=DEFAULT_STORE_ID,
+    )
+
+# Shared by every table in the /changes feed; with change_xid it orders changes across them
+CHANGE_SEQ = Sequence('change_seq', metadata=Base.metadata)
+
+def change_seq_column():
+    # Taken on insert and again on every UPDATE issued through SQLAlchemy
+    return Column(
+        BigInteger, nullable=False,
+        server_default=CHANGE_SEQ.next_value(), onupdate=CHANGE_SEQ.next_value(),
+    )
+
+# The writing transaction's id; xid8 has no cast to bigint, hence the text
+CURRENT_XID_SQL = "pg_current_xact_id()::text::bigint"
+
+def change_xid_column():
+    # /changes only serves rows written by transactions older than the oldest
+    # one still running, so a slow commit cannot land behind the cursor
+    return Column(
+        BigInteger, nullable=False,
+        server_default=text(CURRENT_XID_SQL), onupdate=literal_column(CURRENT_XID_SQL),
+    )
+
+class Store(Base):
+    __tablename__ = 'stores'
+
+    id = Column(String(50), primary_key=True)
+    name = Column(String(255), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+class Reward(Base):
+    __tablename__ = 'rewards'
+
+    id = Column(String(50), primary_key=True, default=generate_uuid)
+    store_id = store_id_column()
+    name = Column(String(255), nullable=False)
+    description = Column(Text, nullable=False, default='')
+    points_required = Column(Integer, nullable=False)
+    tier = Column(Integer, nullable=False)
+    image_url = Column(Text, nullable=False, default='')
+    stock = Column(Integer, nullable=True)  # None = unlimited; decremented by each redemption
+    active = Column(Boolean, nullable=False, default=True, server_default='true')
+    # Set by catalog edits only; catalog caches revalidate on it together with sum(stock)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index('ix_rewards_store_tier', store_id, tier),
+    )
+
 class User(Base):
     __tablename__ = 'users'
     
     id = Column(String(36), primary_key=True, default=generate_uuid)
-    name = Column(String(255), unique=True, nullable=False, index=True)
+    store_id = store_id_column()
+    name = Column(String(255), nullable=False)
     current_points = Column(Integer, default=0)
     lifetime_points = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     points_expiry = Column(DateTime(timezone=True), nullable=True)  # 90 days from last points added
+    version = Column(Integer, nullable=False, default=1, server_default='1')  # bumped on every points/redemption change, served as ETag
+    change_seq = change_seq_column()
+    change_xid = change_xid_column()
 
     redemptions = relationship('Redemption', back_populates='user', cascade='all, delete-orphan')
     transactions = relationship('PointTransaction', back_populates='user', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Names are unique per store, case-insensitively, as register/login compare them
+        Index('ix_users_store_lower_name', store_id, func.lower(name), unique=True),
+        Index('ix_users_store_name', store_id, name),
+        # Leaderboard order; also answers rank lookups as an index-only count
+        Index('ix_users_store_lifetime_points', store_id, lifetime_points.desc()),
+        # Only balances that can still lapse; keyset order for /admin/expiring
+        Index('ix_users_store_points_expiry_active', store_id, points_expiry, id, postgresql_where=current_points > 0),
+        Index('ix_users_store_change_xid', store_id, change_xid, change_seq),
+    )
+
 class Redemption(Base):
     __tablename__ = 'redemptions'
     
     id = Column(String(36), primary_key=True, default=generate_uuid)
+    store_id = store_id_column()
     user_id = Column(String(36), ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     user_name = Column(String(255), nullable=False)
     reward_id = Column(String(50), nullable=False)
@@ -31,20 +103,85 @@ class Redemption(Base):
     points_spent = Column(Integer, nullable=False)
     reward_code = Column(String(50), nullable=False, unique=True)
     claimed = Column(Boolean, default=False, index=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
     claimed_at = Column(DateTime(timezone=True), nullable=True)
+    change_seq = change_seq_column()
+    change_xid = change_xid_column()
     
     user = relationship('User', back_populates='redemptions')
 
+    __table_args__ = (
+        Index('ix_redemptions_store_created_at', store_id, created_at.desc()),
+        Index('ix_redemptions_store_change_xid', store_id, change_xid, change_seq),
+        Index('ix_redemptions_user_change_xid', user_id, change_xid, change_seq),
+    )
+
 class PointTransaction(Base):
     __tablename__ = 'point_transactions'
     
     id = Column(String(36), primary_key=True, default=generate_uuid)
+    store_id = store_id_column()
     user_id = Column(String(36), ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     user_name = Column(String(255), nullable=False)
     points = Column(Integer, nullable=False)
     reason = Column(String(255), nullable=False)
     transaction_type = Column(String(20), nullable=False, index=True)  # "earned" or "spent"
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
+    change_seq = change_seq_column()
+    change_xid = change_xid_column()
     
     user = relationship('User', back_populates='transactions')
+
+    __table_args__ = (
+        Index('ix_point_transactions_store_created_at', store_id, created_at.desc()),
+        Index('ix_point_transactions_store_change_xid', store_id, change_xid, change_seq),
+        Index('ix_point_transactions_user_change_xid', user_id, change_xid, change_seq),
+    )
+
+class UserPeriodPoints(Base):
+    __tablename__ = 'user_period_points'
+
+    # Points earned per user per calendar week/month (UTC), kept by the earn path
+    period = Column(String(10), primary_key=True)  # "week" or "month"
+    period_start = Column(Date, primary_key=True)
+    user_id = Column(String(36), ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    store_id = store_id_column()
+    points = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_user_period_points_top', store_id, period, period_start, points.desc()),
+    )
+
+class DailyStats(Base):
+    __tablename__ = 'daily_stats'
+
+    # UTC day totals, recent days recomputed by rollups.run_daily_rollups
+    store_id = Column(String(50), ForeignKey('stores.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    points_issued = Column(Integer, nullable=False, default=0)
+    points_spent = Column(Integer, nullable=False, default=0)
+    redemptions = Column(Integer, nullable=False, default=0)
+    active_customers = Column(Integer, nullable=False, default=0)
+
+class DailyRewardStats(Base):
+    __tablename__ = 'daily_reward_stats'
+
+    store_id = Column(String(50), ForeignKey('stores.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    reward_id = Column(String(50), primary_key=True)
+    redemptions = Column(Integer, nullable=False, default=0)
+    points_spent = Column(Integer, nullable=False, default=0)
+
+class DailyActiveCustomer(Base):
+    __tablename__ = 'daily_active_customers'
+
+    # Dedup set behind DailyStats.active_customers; a customer counts once per day
+    day = Column(Date, primary_key=True)
+    user_id = Column(String(36), ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    store_id = store_id_column()
+
+class RollupWatermark(Base):
+    __tablename__ = 'rollup_watermarks'
+
+    name = Column(String(50), primary_key=True)
+    high_water = Column(DateTime(timezone=True), nullable=False)
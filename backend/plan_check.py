@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, select, update, func, text, or_
+from sqlalchemy.dialects import postgresql
+
+from models import (
+    User, Redemption, PointTransaction, Reward, UserPeriodPoints, DailyStats, DailyRewardStats,
+)
+from rollups import DAILY_ROLLUP_SQL, ROLLUP_RESCAN_DAYS, daily_rollup_params, earned_points_upsert, period_start
+from serialization import USER_COLUMNS
+from user_cache import CACHED_COLUMNS
+from server import user_rank_expr, expiring_users_query, CHANGE_FEEDS, CHANGE_HORIZON, change_feed_query
+
+# Query-plan regression suite, run against a database filled by generate_data.py:
+#     python plan_check.py                    # fail on seq scans or cost regressions
+#     python plan_check.py --update-baseline  # accept the current plans
+# Every statement server.py issues is EXPLAIN ANALYZEd with realistic
+# parameters. DML runs inside a transaction that is rolled back.
+
+load_dotenv(Path(__file__).parent / '.env')
+
+BASELINE_FILE = Path(__file__).parent / 'query_plan_baseline.json'
+LARGE_TABLES = {"users", "point_transactions", "redemptions", "user_period_points", "daily_active_customers"}
+
+def build_queries(sample):
+    now = datetime.now(timezone.utc)
+    store_id, user_id, name = sample["store_id"], sample["user_id"], sample["name"]
+    since = now.date() - timedelta(days=29)
+    reward_totals = (
+        select(
+            DailyRewardStats.reward_id,
+            func.sum(DailyRewardStats.redemptions).label("redemptions"),
+            func.sum(DailyRewardStats.points_spent).label("points_spent"),
+        )
+        .where(DailyRewardStats.store_id == store_id, DailyRewardStats.day >= since)
+        .group_by(DailyRewardStats.reward_id)
+        .subquery()
+    )
+    # name -> (statement, allow_seq_scan)
+    queries = {
+        "login_by_name": select(User).where(User.store_id == store_id, func.lower(User.name) == name.lower()),
+        "get_user": select(*CACHED_COLUMNS).where(User.id == user_id),
+        "user_version": select(User.version, User.points_expiry, User.current_points).where(User.id == user_id),
+        "user_with_rank": select(User, user_rank_expr()).where(User.id == user_id),
+        "recent_redemptions": select(Redemption).where(Redemption.user_id == user_id)
+            .order_by(Redemption.created_at.desc()).limit(100),
+        "leaderboard": select(User.id, User.name, User.current_points, User.lifetime_points, User.points_expiry)
+            .where(User.store_id == store_id).order_by(User.lifetime_points.desc()).limit(50),
+        "expiring_page": expiring_users_query(store_id, 14).limit(101),
+        "admin_transactions": select(PointTransaction).where(PointTransaction.store_id == store_id)
+            .order_by(PointTransaction.created_at.desc()).limit(500),
+        "admin_redemptions": select(Redemption).where(Redemption.store_id == store_id)
+            .order_by(Redemption.created_at.desc()).limit(500),
+        "daily_analytics": select(DailyStats)
+            .where(DailyStats.store_id == store_id, DailyStats.day >= since).order_by(DailyStats.day),
+        "reward_analytics": select(reward_totals, Reward.name, Reward.tier)
+            .outerjoin(Reward, Reward.id == reward_totals.c.reward_id),
+        "earn_rollup_upsert": earned_points_upsert(store_id, user_id, 10, now),
+        "redeem_debit": update(User)
+            .where(User.id == user_id, User.current_points >= 200,
+                   or_(User.points_expiry.is_(None), User.points_expiry >= now))
+            .values(current_points=User.current_points - 200, version=User.version + 1),
+        "claim_version_bump": update(User).where(User.id == user_id).values(version=User.version + 1),
+    }
+    for period in ("week", "month"):
+        queries[f"leaderboard_{period}"] = (
+            select(User.id, User.name, User.current_points, User.lifetime_points, User.points_expiry,
+                   UserPeriodPoints.points)
+            .join(UserPeriodPoints, UserPeriodPoints.user_id == User.id)
+            .where(
+                UserPeriodPoints.store_id == store_id,
+                UserPeriodPoints.period == period,
+                UserPeriodPoints.period_start == period_start(period, now),
+            )
+            .order_by(UserPeriodPoints.points.desc())
+            .limit(50)
+        )
+    for name, model in CHANGE_FEEDS.items():
+        queries[f"changes_{name}"] = change_feed_query(model, store_id, (0, 0), sample["horizon"], None, 501)
+        queries[f"changes_{name}_user"] = change_feed_query(model, store_id, (0, 0), sample["horizon"], user_id, 501)
+    rollup_params = daily_rollup_params(now.date() - timedelta(days=ROLLUP_RESCAN_DAYS - 1))
+    for i, cmd in enumerate(DAILY_ROLLUP_SQL):
+        # text() only accepts the parameters a statement uses
+        queries[f"daily_rollup_{i}"] = text(cmd).bindparams(**{k: v for k, v in rollup_params.items() if f":{k}" in cmd})
+    plans = {name: (stmt, False) for name, stmt in queries.items()}
+    # Lists the whole store by design; no index makes reading every row cheaper
+    plans["all_users"] = (select(*USER_COLUMNS).where(User.store_id == store_id).order_by(User.name), True)
+    return plans
+
+def seq_scans(node, found=None):
+    found = [] if found is None else found
+    if node.get("Node Type") == "Seq Scan":
+        found.append(node.get("Relation Name"))
+    for child in node.get("Plans", []):
+        seq_scans(child, found)
+    return found
+
+def explain(raw, stmt):
+    compiled = stmt.compile(dialect=postgresql.psycopg2.dialect())
+    cursor = raw.cursor()
+    try:
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + str(compiled), compiled.params)
+        return cursor.fetchone()[0][0]
+    finally:
+        raw.rollback()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="EXPLAIN every server.py query and compare with a baseline")
+    parser.add_argument("--database-url", default=os.environ.get('DATABASE_URL'))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative cost increase")
+    parser.add_argument("--output", type=Path, help="directory to write each plan's JSON to")
+    parser.add_argument("--allow-remote", action="store_true", help="permit a non-local database host")
+    args = parser.parse_args()
+    if not args.database_url:
+        sys.exit("DATABASE_URL is not set")
+    # EXPLAIN ANALYZE really executes the DML statements, row locks included
+    host = urlparse(args.database_url).hostname or "localhost"
+    if host not in ("localhost", "127.0.0.1", "::1") and not args.allow_remote:
+        sys.exit(f"Refusing to run EXPLAIN ANALYZE against {host}; pass --allow-remote if you mean it")
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(User.id, User.store_id, User.name).order_by(User.id).offset(1000).limit(1)
+        ).one_or_none() or conn.execute(select(User.id, User.store_id, User.name).limit(1)).one_or_none()
+        horizon = conn.execute(CHANGE_HORIZON).scalar_one()
+    if row is None:
+        sys.exit("No users found; load data with generate_data.py first")
+    sample = {"user_id": row.id, "store_id": row.store_id, "name": row.name, "horizon": horizon}
+
+    baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    if args.output:
+        args.output.mkdir(parents=True, exist_ok=True)
+
+    results, failures = {}, []
+    raw = engine.raw_connection()
+    try:
+        for name, (stmt, allow_seq_scan) in build_queries(sample).items():
+            plan = explain(raw, stmt)
+            cost = plan["Plan"]["Total Cost"]
+            results[name] = {"total_cost": cost}
+            if args.output:
+                (args.output / f"{name}.json").write_text(json.dumps(plan, indent=2))
+            scanned = sorted(set(seq_scans(plan["Plan"])) & LARGE_TABLES)
+            if scanned and not allow_seq_scan:
+                failures.append(f"{name}: sequential scan on {', '.join(scanned)}")
+            expected = baseline.get(name, {}).get("total_cost")
+            if expected is not None and cost > expected * (1 + args.tolerance):
+                failures.append(f"{name}: cost {cost:.1f} exceeds baseline {expected:.1f}")
+            print(f"{name:24} cost={cost:>12.1f} time={plan['Execution Time']:>9.2f}ms")
+    finally:
+        raw.close()
+
+    if args.update_baseline:
+        BASELINE_FILE.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        print(f"✅ Baseline written to {BASELINE_FILE.name}")
+        return
+    if failures:
+        print("\n❌ Plan regressions:")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+    print("\n✅ All query plans OK")
+
+if __name__ == "__main__":
+    main()
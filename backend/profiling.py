@@ -0,0 +1,193 @@
+import os
+import sys
+import hmac
+import time
+import uuid
+import random
+import asyncio
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+
+from starlette.datastructures import Headers
+
+logger = logging.getLogger("profiling")
+
+# ==================== SAMPLER ====================
+
+def _label(frame) -> str:
+    code = frame.f_code
+    # Collapsed-stack lines use ";" between frames and " " before the count
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})".replace(";", ",")
+
+def _frame_stack(frame):
+    stack = []
+    while frame is not None:
+        stack.append(_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+def _await_stack(coro):
+    # A suspended task has no thread stack; follow its chain of awaits instead
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return stack
+
+class Sampler:
+    # Samples one request's task from a background thread. When the task is on
+    # the CPU its real stack is recorded; while it is suspended, its await chain
+    # is recorded under "[await]", so time spent waiting on the database shows
+    # up too. Work the request hands to other tasks (asyncio.gather,
+    # single_flight) appears as the await on them.
+
+    def __init__(self, loop, task, interval: float):
+        self.loop = loop
+        self.task = task
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        # The loop thread can hold the GIL past the interval while it computes,
+        # so each sample is weighted by the microseconds it stands for
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = int((now - last) * 1_000_000), now
+            if self.task.done():
+                continue
+            if asyncio.current_task(self.loop) is self.task:
+                frame = sys._current_frames().get(self.thread_id)
+                stack = _frame_stack(frame)
+            else:
+                stack = ["[await]"] + _await_stack(self.task.get_coro())
+            if stack:
+                self.samples[";".join(stack)] += weight
+
+    def collapsed(self) -> str:
+        # Brendan Gregg's folded format, weights in microseconds; flamegraph.pl and speedscope read it
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+# ==================== MIDDLEWARE ====================
+
+class ProfilingMiddleware:
+    # Only installed when PROFILING_ENABLED=1, so nothing runs otherwise. A
+    # request is profiled when it sends X-Profile with the admin password in
+    # X-Admin-Password, or at random with probability sample_rate. The folded
+    # stacks go to profile_dir (named in the X-Profile-File header), or replace
+    # the response body with "X-Profile: inline". One profile runs at a time.
+    # Once profile_dir holds max_files profiles, file profiles are skipped
+    # until old ones are removed.
+
+    def __init__(self, app, password: str, profile_dir: str = "profiles",
+                 sample_rate: float = 0.0, interval: float = 0.005, max_files: int = 100):
+        self.app = app
+        self.password = password
+        self.profile_dir = Path(profile_dir)
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_files = max_files
+        self._busy = threading.Lock()
+
+    def _mode(self, scope):
+        headers = Headers(scope=scope)
+        requested = headers.get("x-profile")
+        if requested and hmac.compare_digest(headers.get("x-admin-password", ""), self.password):
+            return "inline" if requested == "inline" else "file"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "file"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        mode = self._mode(scope) if scope["type"] == "http" else None
+        if mode is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            if mode == "inline":
+                await self._profile_inline(scope, receive, send)
+            else:
+                await self._profile_to_file(scope, receive, send)
+        finally:
+            self._busy.release()
+
+    def _sampler(self) -> Sampler:
+        return Sampler(asyncio.get_running_loop(), asyncio.current_task(), self.interval)
+
+    def _room_for_file(self) -> bool:
+        if not self.profile_dir.is_dir():
+            return True
+        return sum(1 for _ in self.profile_dir.glob("*.folded")) < self.max_files
+
+    def _save(self, name: str, sampler: Sampler) -> None:
+        sampler.stop()
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        (self.profile_dir / name).write_text(sampler.collapsed())
+
+    async def _profile_to_file(self, scope, receive, send):
+        # Thread join and disk access stay off the event loop
+        if not await asyncio.to_thread(self._room_for_file):
+            logger.warning("Not profiling %s %s: %s already holds %d profiles",
+                           scope["method"], scope["path"], self.profile_dir, self.max_files)
+            await self.app(scope, receive, send)
+            return
+        path = "".join(c if c.isalnum() or c in "-_" else "_" for c in scope["path"].strip("/"))
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{path[:80]}-{uuid.uuid4().hex[:8]}.folded"
+
+        async def send_with_name(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-file", name.encode())]}
+            await send(message)
+
+        sampler = self._sampler()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_name)
+        finally:
+            elapsed = time.perf_counter() - started
+            await asyncio.to_thread(self._save, name, sampler)
+            logger.info("Profiled %s %s in %.1f ms -> %s", scope["method"], scope["path"], elapsed * 1000, name)
+
+    async def _profile_inline(self, scope, receive, send):
+        # The real response is run to completion and dropped; its status is kept in a header
+        status = None
+
+        async def capture(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        sampler = self._sampler()
+        sampler.start()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            await asyncio.to_thread(sampler.stop)
+        body = sampler.collapsed().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profile-status", str(status).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
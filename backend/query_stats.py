@@ -0,0 +1,103 @@
+import json
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("query_stats")
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    db_seconds: float = 0.0
+
+# Nested trackers (a test around a request that the middleware also tracks) all count
+_active: ContextVar[Tuple[QueryStats, ...]] = ContextVar("query_stats", default=())
+
+# ==================== ENGINE HOOKS ====================
+
+# The start time lives on the statement's execution context, which is dropped
+# with the statement; after_cursor_execute never fires for one that raises
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    for stats in _active.get():
+        stats.count += 1
+        stats.db_seconds += elapsed
+
+def instrument_engine(engine: Engine) -> None:
+    # Pass engine.sync_engine for an AsyncEngine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+@contextmanager
+def track_queries():
+    stats = QueryStats()
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+@contextmanager
+def assert_max_queries(limit: int):
+    # For tests, once instrument_engine(engine.sync_engine) has run. Use an
+    # in-task client (httpx.AsyncClient with ASGITransport) so the request
+    # shares this context:
+    #     with assert_max_queries(2):
+    #         await client.get(f"/api/users/{user_id}")
+    with track_queries() as stats:
+        yield stats
+    assert stats.count <= limit, f"expected at most {limit} queries, got {stats.count}"
+
+# ==================== MIDDLEWARE ====================
+
+class QueryStatsMiddleware:
+    # Adds Server-Timing and one structured log line per HTTP request.
+    # Sessions run on the request's task, so the contextvar set here reaches them.
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = None
+        with track_queries() as stats:
+
+            async def send_with_timing(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    # Counted when headers go out; a streamed body's later
+                    # queries only show up in the log line.
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(stats).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                logger.info(json.dumps({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "queries": stats.count,
+                    "db_ms": round(stats.db_seconds * 1000, 2),
+                    "total_ms": round((time.perf_counter() - started) * 1000, 2),
+                }))
+
+def server_timing(stats: QueryStats) -> str:
+    return f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.count} queries"'
@@ -0,0 +1,18 @@
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+from sqlalchemy import create_engine, text
+
+from rollups import REBUILD_PERIOD_POINTS_SQL
+
+load_dotenv(Path(__file__).parent / '.env')
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+engine = create_engine(DATABASE_URL)
+
+# Recompute weekly/monthly earned-points rollups from point_transactions
+with engine.begin() as conn:
+    for cmd in REBUILD_PERIOD_POINTS_SQL:
+        conn.execute(text(cmd))
+    count = conn.execute(text("SELECT count(*) FROM user_period_points")).scalar_one()
+    print(f"✅ Rebuilt user_period_points ({count} rows)")
@@ -0,0 +1,141 @@
+from sqlalchemy import select, update, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, time, timedelta, timezone
+
+from models import UserPeriodPoints, RollupWatermark
+
+PERIODS = ("week", "month")
+
+def period_start(period: str, at: datetime) -> date:
+    # Matches date_trunc('week'|'month', at AT TIME ZONE 'UTC') used by the rebuild
+    day = at.astimezone(timezone.utc).date()
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def earned_points_upsert(store_id: str, user_id: str, points: int, at: datetime):
+    stmt = pg_insert(UserPeriodPoints).values([
+        {"period": p, "period_start": period_start(p, at), "user_id": user_id, "store_id": store_id, "points": points}
+        for p in PERIODS
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserPeriodPoints.period, UserPeriodPoints.period_start, UserPeriodPoints.user_id],
+        set_={"points": UserPeriodPoints.points + stmt.excluded.points},
+    )
+    return stmt
+
+async def record_earned_points(db: AsyncSession, store_id: str, user_id: str, points: int, at: datetime) -> None:
+    # Runs in the caller's transaction, so the rollup commits with the ledger row
+    await db.execute(earned_points_upsert(store_id, user_id, points, at))
+
+# The table lock makes concurrent earns wait until the rebuilt totals are
+# committed, then apply their increment on top, so nothing is lost or doubled.
+REBUILD_PERIOD_POINTS_SQL = [
+    "LOCK TABLE user_period_points IN EXCLUSIVE MODE",
+    "DELETE FROM user_period_points",
+    """
+    INSERT INTO user_period_points (period, period_start, user_id, store_id, points)
+    SELECT p.period, date_trunc(p.period, t.created_at AT TIME ZONE 'UTC')::date, t.user_id, u.store_id, sum(t.points)
+    FROM point_transactions t
+    JOIN users u ON u.id = t.user_id
+    CROSS JOIN (VALUES ('week'), ('month')) AS p(period)
+    WHERE t.transaction_type = 'earned'
+    GROUP BY 1, 2, 3, 4
+    """,
+]
+
+# ==================== DAILY ANALYTICS ====================
+
+DAILY_WATERMARK = "daily_stats"
+# Rows are stamped in Python before their transaction commits, so a row can
+# become visible after a run has passed its timestamp. Each run recomputes
+# whole days instead of adding increments: every day since the previous run,
+# and always the last ROLLUP_RESCAN_DAYS, so a late commit lands on a later
+# run rather than being skipped.
+ROLLUP_RESCAN_DAYS = 2
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Each table's rows from :day on are replaced, in one transaction, so readers
+# see either the old totals or the new ones. The inserts also overwrite on
+# conflict, so each statement is safe on its own (plan_check runs them so).
+DAILY_ROLLUP_SQL = [
+    "DELETE FROM daily_active_customers WHERE day >= :day",
+    """
+    INSERT INTO daily_active_customers (day, user_id, store_id)
+    SELECT DISTINCT (created_at AT TIME ZONE 'UTC')::date, user_id, store_id
+    FROM point_transactions
+    WHERE created_at >= :since
+    ON CONFLICT DO NOTHING
+    """,
+    "DELETE FROM daily_reward_stats WHERE day >= :day",
+    """
+    INSERT INTO daily_reward_stats (store_id, day, reward_id, redemptions, points_spent)
+    SELECT store_id, (created_at AT TIME ZONE 'UTC')::date, reward_id, count(*), sum(points_spent)
+    FROM redemptions
+    WHERE created_at >= :since
+    GROUP BY 1, 2, 3
+    ON CONFLICT (store_id, day, reward_id) DO UPDATE SET
+        redemptions = EXCLUDED.redemptions,
+        points_spent = EXCLUDED.points_spent
+    """,
+    "DELETE FROM daily_stats WHERE day >= :day",
+    """
+    WITH points AS (
+        SELECT store_id, (created_at AT TIME ZONE 'UTC')::date AS day,
+               coalesce(sum(points) FILTER (WHERE transaction_type = 'earned'), 0) AS issued,
+               coalesce(sum(points) FILTER (WHERE transaction_type = 'spent'), 0) AS spent
+        FROM point_transactions
+        WHERE created_at >= :since
+        GROUP BY 1, 2
+    ), redeemed AS (
+        SELECT store_id, (created_at AT TIME ZONE 'UTC')::date AS day, count(*) AS redemptions
+        FROM redemptions
+        WHERE created_at >= :since
+        GROUP BY 1, 2
+    ), active AS (
+        SELECT store_id, day, count(*) AS customers
+        FROM daily_active_customers
+        WHERE day >= :day
+        GROUP BY 1, 2
+    )
+    INSERT INTO daily_stats (store_id, day, points_issued, points_spent, redemptions, active_customers)
+    SELECT store_id, day, coalesce(issued, 0), coalesce(spent, 0), coalesce(redemptions, 0), coalesce(customers, 0)
+    FROM points
+    FULL JOIN redeemed USING (store_id, day)
+    FULL JOIN active USING (store_id, day)
+    ON CONFLICT (store_id, day) DO UPDATE SET
+        points_issued = EXCLUDED.points_issued,
+        points_spent = EXCLUDED.points_spent,
+        redemptions = EXCLUDED.redemptions,
+        active_customers = EXCLUDED.active_customers
+    """,
+]
+
+def daily_rollup_params(day: date) -> dict:
+    return {"day": day, "since": datetime.combine(day, time.min, tzinfo=timezone.utc)}
+
+async def run_daily_rollups(db: AsyncSession) -> None:
+    # The watermark row is locked for the whole batch, so overlapping runs
+    # (another host, a manual run) queue up instead of interleaving.
+    await db.execute(
+        pg_insert(RollupWatermark)
+        .values(name=DAILY_WATERMARK, high_water=EPOCH)
+        .on_conflict_do_nothing()
+    )
+    result = await db.execute(
+        select(RollupWatermark.high_water)
+        .where(RollupWatermark.name == DAILY_WATERMARK)
+        .with_for_update()
+    )
+    last_run = result.scalar_one()
+    now = datetime.now(timezone.utc)
+    day = min(last_run.astimezone(timezone.utc).date(), now.date() - timedelta(days=ROLLUP_RESCAN_DAYS - 1))
+    for cmd in DAILY_ROLLUP_SQL:
+        await db.execute(text(cmd), daily_rollup_params(day))
+    await db.execute(
+        update(RollupWatermark)
+        .where(RollupWatermark.name == DAILY_WATERMARK)
+        .values(high_water=now)
+    )
+    await db.commit()
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+
+from models import User
+
+# Only what a user payload needs, so list endpoints read plain Core rows
+# instead of hydrating ORM objects into the identity map
+USER_COLUMNS = (
+    User.id, User.store_id, User.name, User.current_points, User.lifetime_points,
+    User.created_at, User.points_expiry,
+)
+
+def _default(value):
+    # Pydantic models and anything else orjson lacks go through FastAPI's encoder
+    return jsonable_encoder(value)
+
+def encode_json(value) -> bytes:
+    # OPT_UTC_Z writes UTC as "Z", as Pydantic does, so output matches FastAPI's
+    return orjson.dumps(value, default=_default, option=orjson.OPT_UTC_Z)
+
+def json_response(value) -> Response:
+    return Response(content=encode_json(value), media_type="application/json")
+
+def user_payload(user, now: datetime) -> dict:
+    # Works on a User or a row of USER_COLUMNS; the caller passes one `now` per batch
+    expired = (
+        user.points_expiry is not None
+        and user.points_expiry < now
+        and user.current_points > 0
+    )
+    return {
+        "id": user.id,
+        "store_id": user.store_id,
+        "name": user.name,
+        "current_points": 0 if expired else user.current_points,
+        "lifetime_points": user.lifetime_points,
+        "created_at": user.created_at,
+        "points_expiry": user.points_expiry,
+        "points_expired": expired,
+    }
@@ -0,0 +1,62 @@
+import os
+import math
+import uvicorn
+
+# Supabase's pooler caps client connections per project; every worker gets an
+# equal share of this budget instead of its own pool_size=10, max_overflow=5.
+DB_CONNECTION_BUDGET = int(os.environ.get('DB_CONNECTION_BUDGET', '15'))
+# The dashboard opens two sessions at once and the leader's rollup job a third
+MIN_CONNECTIONS_PER_WORKER = 3
+
+def available_cpus() -> int:
+    # os.cpu_count() is the host's in a container; use the CPUs this process may
+    # run on, capped by the cgroup quota (v2 cpu.max, else v1 cfs files)
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    quota = period = None
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            limit, period = f.read().split()
+            quota = None if limit == 'max' else int(limit)
+            period = int(period)
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            pass
+    if quota is not None and quota > 0 and period:
+        cpus = min(cpus, math.ceil(quota / period))
+    return max(cpus, 1)
+
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', str(available_cpus())))
+
+def pool_sizes(budget: int, workers: int) -> tuple[int, int]:
+    per_worker = max(budget // workers, 1)
+    pool_size = max(per_worker * 2 // 3, 1)
+    return pool_size, per_worker - pool_size
+
+def main() -> None:
+    # Each worker needs a few connections of its own, so the budget also caps the worker count
+    workers = max(min(WEB_CONCURRENCY, DB_CONNECTION_BUDGET // MIN_CONNECTIONS_PER_WORKER), 1)
+    pool_size, max_overflow = pool_sizes(DB_CONNECTION_BUDGET, workers)
+    # Workers are spawned with this environment, so database.py picks these up
+    os.environ.setdefault('DB_POOL_SIZE', str(pool_size))
+    os.environ.setdefault('DB_MAX_OVERFLOW', str(max_overflow))
+    os.environ.setdefault('DB_WARM_CONNECTIONS', str(min(pool_size, 2)))
+
+    # loop/http "auto" pick uvloop and httptools when installed (requirements.txt)
+    uvicorn.run(
+        "server:app",
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', '8001')),
+        workers=workers,
+        loop="auto",
+        http="auto",
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+    )
+
+if __name__ == "__main__":
+    main()
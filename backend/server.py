@@ -1,34 +1,104 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
-from dotenv import load_dotenv
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, update, tuple_, or_, case, literal_column
+from sqlalchemy.orm import aliased
+from contextlib import asynccontextmanager
 import os
+import asyncio
 import logging
+import io
+import csv
+import base64
 import random
 import string
-from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
-from datetime import datetime, timezone, timedelta
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timezone, timedelta
+
+from database import get_db, engine, Base, AsyncSessionLocal, warm_pool, ping_database
+from models import DEFAULT_STORE_ID, generate_uuid, Store, Reward, User, Redemption, PointTransaction, UserPeriodPoints, DailyStats, DailyRewardStats
+from rollups import PERIODS, period_start, record_earned_points, run_daily_rollups
+from leader import is_leader, release_leadership
+from query_stats import QueryStatsMiddleware, instrument_engine
+from catalog import CatalogCache
+from singleflight import single_flight
+from serialization import USER_COLUMNS, encode_json, json_response, user_payload
+from compression import CompressionMiddleware
+from user_cache import CACHED_COLUMNS, UserCache
 
-from database import get_db, engine, Base
-from models import User, Redemption, PointTransaction
+logger = logging.getLogger(__name__)
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+POINTS_EXPIRY_DAYS = 90  # 3 months
+DB_WARM_CONNECTIONS = int(os.environ.get('DB_WARM_CONNECTIONS', '2'))
+DB_WARM_TIMEOUT = float(os.environ.get('DB_WARM_TIMEOUT', '10'))
+READY_TIMEOUT = 2.0
+ANALYTICS_ROLLUP_INTERVAL = int(os.environ.get('ANALYTICS_ROLLUP_INTERVAL', '300'))
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '5'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '4'))
+CHANGES_PAGE_SIZE = 500
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '5'))
+
+# ==================== LIFESPAN ====================
+
+async def warm_hot_queries() -> None:
+    # Compile and run the statements behind the busiest pages once
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            select(User.id, User.name, User.current_points, User.lifetime_points, User.points_expiry)
+            .where(User.store_id == DEFAULT_STORE_ID).order_by(User.lifetime_points.desc()).limit(50)
+        )
+        await session.execute(select(*CACHED_COLUMNS).where(User.id == ""))
+        await session.execute(select(User, user_rank_expr()).where(User.id == ""))
+        await session.execute(
+            select(Redemption).where(Redemption.user_id == "").order_by(Redemption.created_at.desc()).limit(3)
+        )
 
-app = FastAPI()
+async def analytics_rollup_loop() -> None:
+    # Every worker runs the loop; only the elected one does the work, and the
+    # check is repeated so another worker takes over if the leader exits.
+    while True:
+        if is_leader():
+            try:
+                async with AsyncSessionLocal() as session:
+                    await run_daily_rollups(session)
+            except Exception as e:
+                logger.warning("Daily analytics rollup failed: %r", e)
+        await asyncio.sleep(ANALYTICS_ROLLUP_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if engine is None:
+        raise RuntimeError("DATABASE_URL is not set")
+    app.state.warm = False
+    try:
+        await asyncio.wait_for(warm_pool(DB_WARM_CONNECTIONS), DB_WARM_TIMEOUT)
+        await asyncio.wait_for(warm_hot_queries(), DB_WARM_TIMEOUT)
+        app.state.warm = True
+        logger.info("Database pool warmed with %d connections", DB_WARM_CONNECTIONS)
+    except Exception as e:
+        # Serve anyway; /ready reports the database until it comes back
+        logger.warning("Database warm-up failed: %r", e)
+    if is_leader():
+        logger.info("Worker %d elected to run background jobs", os.getpid())
+    rollup_task = asyncio.create_task(analytics_rollup_loop())
+    yield
+    rollup_task.cancel()
+    release_leadership()
+    await engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
-POINTS_EXPIRY_DAYS = 90  # 3 months
-
 # ==================== PYDANTIC MODELS ====================
 
 class UserResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: str
+    store_id: str
     name: str
     current_points: int
     lifetime_points: int
@@ -38,21 +108,16 @@ class UserResponse(BaseModel):
 
     @classmethod
     def from_user(cls, user: User):
-        now = datetime.now(timezone.utc)
-        expired = (
-            user.points_expiry is not None
-            and user.points_expiry < now
-            and user.current_points > 0
-        )
-        return cls(
-            id=user.id,
-            name=user.name,
-            current_points=0 if expired else user.current_points,
-            lifetime_points=user.lifetime_points,
-            created_at=user.created_at,
-            points_expiry=user.points_expiry,
-            points_expired=expired,
-        )
+        return cls(**user_payload(user, datetime.now(timezone.utc)))
+
+class StoreCreate(BaseModel):
+    id: str = Field(min_length=1, max_length=50)
+    name: str
+
+class StoreResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: str
+    name: str
 
 class UserCreate(BaseModel):
     name: str
@@ -73,12 +138,35 @@ class AddPointsRequest(BaseModel):
     reason: Optional[str] = "Purchase"
 
 class RewardItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
     id: str
     name: str
     description: str
     points_required: int
     tier: int
     image_url: str
+    stock: Optional[int] = None
+
+class AdminRewardItem(RewardItem):
+    active: bool
+
+class RewardCreate(BaseModel):
+    id: Optional[str] = Field(default=None, min_length=1, max_length=50)
+    name: str
+    description: str = ""
+    points_required: int = Field(gt=0)
+    tier: int
+    image_url: str = ""
+    stock: Optional[int] = Field(default=None, ge=0)
+
+class RewardUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    points_required: Optional[int] = Field(default=None, gt=0)
+    tier: Optional[int] = None
+    image_url: Optional[str] = None
+    stock: Optional[int] = Field(default=None, ge=0)
+    active: Optional[bool] = None
 
 class RedemptionResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -93,6 +181,36 @@ class RedemptionResponse(BaseModel):
     created_at: datetime
     claimed_at: Optional[datetime]
 
+class CustomerDashboardResponse(BaseModel):
+    user: UserResponse
+    rank: int
+    redemptions: List[RedemptionResponse]
+
+class DailyStatsResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    day: date
+    points_issued: int
+    points_spent: int
+    redemptions: int
+    active_customers: int
+
+class RewardAnalyticsResponse(BaseModel):
+    reward_id: str
+    reward_name: str
+    tier: Optional[int] = None
+    redemptions: int
+    points_spent: int
+
+class ExpiringUserResponse(BaseModel):
+    id: str
+    name: str
+    current_points: int
+    points_expiry: datetime
+
+class ExpiringUsersPage(BaseModel):
+    users: List[ExpiringUserResponse]
+    next_cursor: Optional[str] = None
+
 class RedeemRequest(BaseModel):
     user_id: str
     reward_id: str
@@ -110,50 +228,17 @@ class PointTransactionResponse(BaseModel):
     transaction_type: str
     created_at: datetime
 
+class ChangesResponse(BaseModel):
+    users: List[UserResponse]
+    transactions: List[PointTransactionResponse]
+    redemptions: List[RedemptionResponse]
+    cursor: str
+    has_more: bool
+
 # ==================== REWARDS CATALOG ====================
 
-REWARDS_CATALOG = [
-    RewardItem(
-        id="reward_1",
-        name="10% Off Voucher",
-        description="Get 10% off on your next purchase",
-        points_required=200,
-        tier=1,
-        image_url="https://images.unsplash.com/photo-1556742049-0cfed4f6a45d?w=400&q=80"
-    ),
-    RewardItem(
-        id="reward_2",
-        name="Free Triangle Waffle",
-        description="A delicious crispy triangle waffle",
-        points_required=400,
-        tier=2,
-        image_url="https://images.unsplash.com/photo-1600713531223-aab27a01bb69?w=400&q=80"
-    ),
-    RewardItem(
-        id="reward_3",
-        name="Popsicle Waffle",
-        description="Waffle on a stick - perfect for on-the-go!",
-        points_required=500,
-        tier=3,
-        image_url="https://images.unsplash.com/photo-1740072625684-46f4f1f594d8?w=400&q=80"
-    ),
-    RewardItem(
-        id="reward_4",
-        name="6pc Pancake Stack",
-        description="Six fluffy pancakes with your choice of topping",
-        points_required=600,
-        tier=4,
-        image_url="https://images.unsplash.com/photo-1575831967553-771b0db4f7c1?w=400&q=80"
-    ),
-    RewardItem(
-        id="reward_5",
-        name="Premium Choice",
-        description="Choice of any Waffle OR 10pc Pancake",
-        points_required=800,
-        tier=5,
-        image_url="https://images.unsplash.com/photo-1567620905732-2d1ec7ab7445?w=400&q=80"
-    ),
-]
+CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', '30'))
+catalog_cache = CatalogCache(CATALOG_CACHE_TTL)
 
 ADMIN_PASSWORD = "1607"
 
@@ -165,12 +250,72 @@ def generate_reward_code(reward_name: str) -> str:
 def get_new_expiry() -> datetime:
     return datetime.now(timezone.utc) + timedelta(days=POINTS_EXPIRY_DAYS)
 
+# ==================== USER CACHE ====================
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+# ==================== STORES ====================
+
+def get_store_id(store_id: Optional[str] = None, x_store_id: Optional[str] = Header(None)) -> str:
+    # Header for the apps, query param for plain links such as the CSV export
+    return store_id or x_store_id or DEFAULT_STORE_ID
+
+async def ensure_store(db: AsyncSession, store_id: str) -> None:
+    result = await db.execute(select(Store.id).where(Store.id == store_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Store not found")
+
+# ==================== CONDITIONAL GET ====================
+
+def user_etag(version: int, points_expiry: Optional[datetime], current_points: int) -> str:
+    # points_expired flips with the clock rather than with a write, so it is part of the tag
+    expired = (
+        points_expiry is not None
+        and points_expiry < datetime.now(timezone.utc)
+        and current_points > 0
+    )
+    return f'"{version}-{int(expired)}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+async def get_user_version(db: AsyncSession, user_id: str):
+    result = await db.execute(
+        select(User.version, User.points_expiry, User.current_points).where(User.id == user_id)
+    )
+    return result.one_or_none()
+
 # ==================== PING ====================
 
 @app.get("/ping")
 async def ping():
     return {"status": "alive"}
 
+@app.get("/ready")
+async def ready():
+    try:
+        await asyncio.wait_for(ping_database(), READY_TIMEOUT)
+        database = True
+    except Exception:
+        database = False
+    body = {
+        "status": "ready" if database else "unavailable",
+        "database": database,
+        "warm": app.state.warm,
+    }
+    return JSONResponse(body, status_code=200 if database else 503)
+
 # ==================== USER ROUTES ====================
 
 @api_router.get("/")
@@ -178,42 +323,132 @@ async def root():
     return {"message": "The Waffle Pop Co API"}
 
 @api_router.post("/users/register")
-async def register_user(input: UserCreate, db: AsyncSession = Depends(get_db)):
+async def register_user(input: UserCreate, store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
+    await ensure_store(db, store_id)
     result = await db.execute(
-        select(User).where(func.lower(User.name) == input.name.lower())
+        select(User).where(User.store_id == store_id, func.lower(User.name) == input.name.lower())
     )
     existing = result.scalar_one_or_none()
     if existing:
         raise HTTPException(status_code=400, detail="User with this name already exists")
-    user = User(name=input.name)
+    user = User(store_id=store_id, name=input.name)
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    user_cache.put(user)
     return UserResponse.from_user(user)
 
 @api_router.post("/users/login")
-async def login_user(input: UserLogin, db: AsyncSession = Depends(get_db)):
+async def login_user(input: UserLogin, store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
     result = await db.execute(
-        select(User).where(func.lower(User.name) == input.name.lower())
+        select(User).where(User.store_id == store_id, func.lower(User.name) == input.name.lower())
     )
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found. Please register first.")
     return UserResponse.from_user(user)
 
-@api_router.get("/users/{user_id}")
-async def get_user(user_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if not user:
+@single_flight
+async def load_cached_user(user_id: str):
+    # Concurrent misses for one user share a single query
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(*CACHED_COLUMNS).where(User.id == user_id))
+        row = result.one_or_none()
+    return user_cache.put(row) if row is not None else None
+
+@api_router.get("/users/{user_id}", response_model=UserResponse)
+async def get_user(user_id: str, request: Request):
+    user = user_cache.get(user_id) or await load_cached_user(user_id)
+    if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return UserResponse.from_user(user)
+    etag = user_etag(user.version, user.points_expiry, user.current_points)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    body = encode_json(user_payload(user, datetime.now(timezone.utc)))
+    response = Response(content=body, media_type="application/json")
+    set_etag(response, etag)
+    return response
+
+# ==================== CUSTOMER DASHBOARD ====================
+
+def user_rank_expr():
+    # Same rank as the store's leaderboard: 1 + customers with more lifetime points,
+    # so tied customers share a rank (see competition_ranks).
+    # The count is a range scan on ix_users_store_lifetime_points, never the table.
+    higher = aliased(User)
+    return (
+        select(func.count())
+        .where(higher.store_id == User.store_id, higher.lifetime_points > User.lifetime_points)
+        .scalar_subquery()
+        + 1
+    )
+
+async def load_user_with_rank(user_id: str):
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(User, user_rank_expr().label("rank")).where(User.id == user_id)
+        )
+        return result.one_or_none()
+
+async def load_recent_redemptions(user_id: str, limit: int):
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Redemption)
+            .where(Redemption.user_id == user_id)
+            .order_by(Redemption.created_at.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+@api_router.get("/users/{user_id}/rank")
+async def get_user_rank(user_id: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(User.lifetime_points, user_rank_expr()).where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    lifetime_points, rank = row
+    return {"user_id": user_id, "rank": rank, "lifetime_points": lifetime_points}
+
+@api_router.get("/users/{user_id}/dashboard", response_model=CustomerDashboardResponse)
+async def get_user_dashboard(user_id: str, limit: int = 3):
+    # Two independent statements on separate pooled connections, in parallel
+    row, redemptions = await asyncio.gather(
+        load_user_with_rank(user_id),
+        load_recent_redemptions(user_id, min(max(limit, 0), 100)),
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user, rank = row
+    return CustomerDashboardResponse(
+        user=UserResponse.from_user(user),
+        rank=rank,
+        redemptions=[RedemptionResponse.model_validate(r) for r in redemptions],
+    )
 
 @api_router.get("/users")
-async def get_all_users(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).order_by(User.name))
-    users = result.scalars().all()
-    return [UserResponse.from_user(u) for u in users]
+async def get_all_users(store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(*USER_COLUMNS).where(User.store_id == store_id).order_by(User.name))
+    now = datetime.now(timezone.utc)
+    return json_response([user_payload(row, now) for row in result])
+
+# ==================== STORE ROUTES ====================
+
+@api_router.get("/stores", response_model=List[StoreResponse])
+async def get_stores(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Store).order_by(Store.name))
+    return result.scalars().all()
+
+@api_router.post("/admin/stores", response_model=StoreResponse)
+async def create_store(input: StoreCreate, db: AsyncSession = Depends(get_db)):
+    existing = await db.execute(select(Store.id).where(Store.id == input.id))
+    if existing.scalar_one_or_none():
+        raise HTTPException(status_code=400, detail="Store with this id already exists")
+    store = Store(id=input.id, name=input.name)
+    db.add(store)
+    await db.commit()
+    return store
 
 # ==================== ADMIN ROUTES ====================
 
@@ -223,36 +458,52 @@ async def admin_login(input: AdminLogin):
         raise HTTPException(status_code=401, detail="Invalid admin password")
     return {"success": True, "message": "Admin login successful"}
 
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats():
+    # Per worker; each process keeps its own cache
+    return {"users": user_cache.stats()}
+
 @api_router.post("/admin/create-user")
-async def create_user_with_points(input: UserCreateWithPoints, db: AsyncSession = Depends(get_db)):
+async def create_user_with_points(input: UserCreateWithPoints, store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
+    await ensure_store(db, store_id)
     result = await db.execute(
-        select(User).where(func.lower(User.name) == input.name.lower())
+        select(User).where(User.store_id == store_id, func.lower(User.name) == input.name.lower())
     )
     existing = result.scalar_one_or_none()
     if existing:
         raise HTTPException(status_code=400, detail="User with this name already exists")
 
+    now = datetime.now(timezone.utc)
+    # Client-side id lets the user and its first transaction go out in one commit
     user = User(
+        id=generate_uuid(),
+        store_id=store_id,
         name=input.name,
         current_points=input.points,
         lifetime_points=input.points,
+        created_at=now,
         points_expiry=get_new_expiry() if input.points > 0 else None,
+        version=1,
     )
     db.add(user)
-    await db.commit()
-    await db.refresh(user)
 
     if input.points > 0:
         transaction = PointTransaction(
+            store_id=store_id,
             user_id=user.id,
             user_name=user.name,
             points=input.points,
             reason="Initial Points",
-            transaction_type="earned"
+            transaction_type="earned",
+            created_at=now,
         )
         db.add(transaction)
-        await db.commit()
+        # The rollup upsert is a Core statement, so the ORM inserts must be flushed first
+        await db.flush()
+        await record_earned_points(db, store_id, user.id, input.points, now)
 
+    await db.commit()
+    user_cache.put(user)
     return UserResponse.from_user(user)
 
 @api_router.post("/admin/add-points")
@@ -264,33 +515,176 @@ async def add_points(input: AddPointsRequest, db: AsyncSession = Depends(get_db)
 
     now = datetime.now(timezone.utc)
 
-    # If points were previously expired, reset current_points to 0 first
-    if user.points_expiry and user.points_expiry < now:
-        user.current_points = 0
-
-    user.current_points += input.points
-    user.lifetime_points += input.points
+    # Applied in SQL against the row as it is when the UPDATE runs, so
+    # concurrent changes neither lose points nor share a version.
+    # If points were previously expired, reset current_points to 0 first.
+    user.current_points = case(
+        (User.points_expiry < now, 0), else_=User.current_points
+    ) + input.points
+    user.lifetime_points = User.lifetime_points + input.points
     user.points_expiry = get_new_expiry()  # Reset expiry on every new addition
+    user.version = User.version + 1
 
     transaction = PointTransaction(
+        store_id=user.store_id,
         user_id=user.id,
         user_name=user.name,
         points=input.points,
         reason=input.reason,
-        transaction_type="earned"
+        transaction_type="earned",
+        created_at=now,
     )
     db.add(transaction)
+    await record_earned_points(db, user.store_id, user.id, input.points, now)
     await db.commit()
     await db.refresh(user)
+    user_cache.put(user)
 
     return {"success": True, "user": UserResponse.from_user(user)}
 
+# ==================== ANALYTICS ====================
+
+def analytics_since(days: int) -> date:
+    days = min(max(days, 1), 366)
+    return datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+
+@api_router.get("/admin/analytics/daily", response_model=List[DailyStatsResponse])
+async def get_daily_analytics(days: int = 30, store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(DailyStats)
+        .where(DailyStats.store_id == store_id, DailyStats.day >= analytics_since(days))
+        .order_by(DailyStats.day)
+    )
+    return result.scalars().all()
+
+@api_router.get("/admin/analytics/rewards", response_model=List[RewardAnalyticsResponse])
+async def get_reward_analytics(days: int = 30, store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
+    totals = (
+        select(
+            DailyRewardStats.reward_id,
+            func.sum(DailyRewardStats.redemptions).label("redemptions"),
+            func.sum(DailyRewardStats.points_spent).label("points_spent"),
+        )
+        .where(DailyRewardStats.store_id == store_id, DailyRewardStats.day >= analytics_since(days))
+        .group_by(DailyRewardStats.reward_id)
+        .subquery()
+    )
+    # Joined rather than read from the cache so retired rewards keep their names
+    result = await db.execute(
+        select(totals, Reward.name, Reward.tier)
+        .outerjoin(Reward, Reward.id == totals.c.reward_id)
+        .order_by(Reward.tier.nulls_last(), totals.c.reward_id)
+    )
+    return [
+        RewardAnalyticsResponse(
+            reward_id=row.reward_id,
+            reward_name=row.name or row.reward_id,
+            tier=row.tier,
+            redemptions=row.redemptions,
+            points_spent=row.points_spent,
+        )
+        for row in result.all()
+    ]
+
+# ==================== EXPIRING POINTS ====================
+
+EXPORT_PAGE_SIZE = 1000
+
+def encode_expiry_cursor(points_expiry: datetime, user_id: str) -> str:
+    raw = f"{points_expiry.isoformat()}|{user_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_expiry_cursor(cursor: str):
+    try:
+        expiry, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(expiry), user_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def expiring_users_query(store_id: str, within_days: int, after=None):
+    # Predicate mirrors ix_users_store_points_expiry_active so the scan stays on the partial index
+    now = datetime.now(timezone.utc)
+    stmt = (
+        select(User.id, User.name, User.current_points, User.points_expiry)
+        .where(
+            User.store_id == store_id,
+            User.current_points > 0,
+            User.points_expiry > now,
+            User.points_expiry <= now + timedelta(days=within_days),
+        )
+        .order_by(User.points_expiry, User.id)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(User.points_expiry, User.id) > tuple_(*after))
+    return stmt
+
+@api_router.get("/admin/expiring", response_model=ExpiringUsersPage)
+async def get_expiring_users(
+    within_days: int = 14,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    store_id: str = Depends(get_store_id),
+    db: AsyncSession = Depends(get_db),
+):
+    limit = min(max(limit, 1), 1000)
+    after = decode_expiry_cursor(cursor) if cursor else None
+    result = await db.execute(expiring_users_query(store_id, within_days, after).limit(limit + 1))
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_expiry_cursor(rows[-1].points_expiry, rows[-1].id)
+    return ExpiringUsersPage(
+        users=[ExpiringUserResponse(**row._mapping) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+# Spreadsheets run a cell starting with one of these as a formula
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def csv_text(value: str) -> str:
+    # Customers choose their own names; a leading quote keeps them as text
+    return "'" + value if value.startswith(CSV_FORMULA_PREFIXES) else value
+
+async def stream_expiring_csv(store_id: str, within_days: int):
+    # Opens its own session: request-scoped dependencies are torn down
+    # before a StreamingResponse body is sent.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "name", "current_points", "points_expiry"])
+    after = None
+    async with AsyncSessionLocal() as session:
+        while True:
+            result = await session.execute(
+                expiring_users_query(store_id, within_days, after).limit(EXPORT_PAGE_SIZE)
+            )
+            rows = result.all()
+            for row in rows:
+                writer.writerow([row.id, csv_text(row.name), row.current_points, row.points_expiry.isoformat()])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            if len(rows) < EXPORT_PAGE_SIZE:
+                break
+            after = (rows[-1].points_expiry, rows[-1].id)
+
+@api_router.get("/admin/expiring/export")
+async def export_expiring_users(within_days: int = 14, store_id: str = Depends(get_store_id)):
+    return StreamingResponse(
+        stream_expiring_csv(store_id, within_days),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="expiring-{store_id}-{within_days}d.csv"'},
+    )
+
 # ==================== TRANSACTIONS ====================
 
 @api_router.get("/admin/transactions", response_model=List[PointTransactionResponse])
-async def get_transactions(db: AsyncSession = Depends(get_db)):
+async def get_transactions(store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
     result = await db.execute(
-        select(PointTransaction).order_by(PointTransaction.created_at.desc()).limit(500)
+        select(PointTransaction)
+        .where(PointTransaction.store_id == store_id)
+        .order_by(PointTransaction.created_at.desc())
+        .limit(500)
     )
     transactions = result.scalars().all()
     return transactions
@@ -304,10 +698,12 @@ async def subtract_points(input: AddPointsRequest, db: AsyncSession = Depends(ge
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Allow points to go negative — no floor/cap
-    user.current_points = user.current_points - input.points
+    # Allow points to go negative — no floor/cap. Computed in SQL, like add_points.
+    user.current_points = User.current_points - input.points
+    user.version = User.version + 1
 
     transaction = PointTransaction(
+        store_id=user.store_id,
         user_id=user.id,
         user_name=user.name,
         points=input.points,
@@ -317,14 +713,18 @@ async def subtract_points(input: AddPointsRequest, db: AsyncSession = Depends(ge
     db.add(transaction)
     await db.commit()
     await db.refresh(user)
+    user_cache.put(user)
 
     return {"success": True, "user": UserResponse.from_user(user)}
 
 # ==================== REWARDS ROUTES ====================
 
 @api_router.get("/rewards", response_model=List[RewardItem])
-async def get_rewards():
-    return REWARDS_CATALOG
+@single_flight(as_json=True)
+async def get_rewards(store_id: str = Depends(get_store_id)):
+    async with AsyncSessionLocal() as session:
+        rewards = await catalog_cache.list(session, store_id)
+    return [RewardItem.model_validate(r) for r in rewards]
 
 @api_router.post("/rewards/redeem")
 async def redeem_reward(input: RedeemRequest, db: AsyncSession = Depends(get_db)):
@@ -338,55 +738,189 @@ async def redeem_reward(input: RedeemRequest, db: AsyncSession = Depends(get_db)
     if user.points_expiry and user.points_expiry < now:
         raise HTTPException(status_code=400, detail="Your points have expired. Please visit us to earn new points!")
 
-    reward = next((r for r in REWARDS_CATALOG if r.id == input.reward_id), None)
+    reward = await catalog_cache.get(db, user.store_id, input.reward_id)
     if not reward:
         raise HTTPException(status_code=404, detail="Reward not found")
 
     if user.current_points < reward.points_required:
         raise HTTPException(status_code=400, detail="Insufficient points")
 
-    user.current_points -= reward.points_required
+    # The cached row only fast-fails. Stock and balance are checked and taken by
+    # conditional UPDATEs in this transaction, so concurrent redemptions
+    # cannot oversell a reward or overdraw a balance. Unlimited rewards are
+    # only re-read, since an UPDATE would lock the row until commit and queue
+    # up every redemption of a popular reward.
+    claimed = None
+    if reward.stock is None:
+        result = await db.execute(
+            select(Reward.name, Reward.points_required, Reward.stock)
+            .where(Reward.id == reward.id, Reward.active.is_(True))
+        )
+        current = result.one_or_none()
+        if current is not None and current.stock is None:
+            claimed = current
+    limited_stock = claimed is None
+    if limited_stock:
+        result = await db.execute(
+            update(Reward)
+            .where(
+                Reward.id == reward.id,
+                Reward.active.is_(True),
+                Reward.stock.is_not(None),
+                Reward.stock > 0,
+            )
+            .values(stock=Reward.stock - 1)
+            .returning(Reward.name, Reward.points_required)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = result.one_or_none()
+        if claimed is None:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="This reward is out of stock")
 
-    reward_code = generate_reward_code(reward.name)
+    result = await db.execute(
+        update(User)
+        .where(
+            User.id == user.id,
+            User.current_points >= claimed.points_required,
+            or_(User.points_expiry.is_(None), User.points_expiry >= now),
+        )
+        .values(
+            current_points=User.current_points - claimed.points_required,
+            version=User.version + 1,
+        )
+        .returning(*CACHED_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    debited = result.one_or_none()
+    if debited is None:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Insufficient points")
+
+    reward_code = generate_reward_code(claimed.name)
     redemption = Redemption(
+        store_id=user.store_id,
         user_id=user.id,
         user_name=user.name,
         reward_id=reward.id,
-        reward_name=reward.name,
-        points_spent=reward.points_required,
+        reward_name=claimed.name,
+        points_spent=claimed.points_required,
         reward_code=reward_code
     )
     db.add(redemption)
 
     transaction = PointTransaction(
+        store_id=user.store_id,
         user_id=user.id,
         user_name=user.name,
-        points=reward.points_required,
-        reason=f"Redeemed: {reward.name}",
+        points=claimed.points_required,
+        reason=f"Redeemed: {claimed.name}",
         transaction_type="spent"
     )
     db.add(transaction)
 
     await db.commit()
+    user_cache.put(debited)
+    if limited_stock:
+        # Limited stock just went down; don't keep showing the old count here
+        catalog_cache.invalidate(user.store_id)
 
     return {
         "success": True,
         "reward_code": reward_code,
-        "reward_name": reward.name,
-        "points_spent": reward.points_required,
-        "remaining_points": user.current_points
+        "reward_name": claimed.name,
+        "points_spent": claimed.points_required,
+        "remaining_points": debited.current_points
     }
 
+# ==================== ADMIN REWARDS ====================
+
+async def get_store_reward(db: AsyncSession, store_id: str, reward_id: str) -> Reward:
+    result = await db.execute(
+        select(Reward).where(Reward.id == reward_id, Reward.store_id == store_id)
+    )
+    reward = result.scalar_one_or_none()
+    if not reward:
+        raise HTTPException(status_code=404, detail="Reward not found")
+    return reward
+
+@api_router.get("/admin/rewards", response_model=List[AdminRewardItem])
+async def get_admin_rewards(store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
+    # Straight from the table: includes retired rewards and live stock counts
+    result = await db.execute(
+        select(Reward).where(Reward.store_id == store_id).order_by(Reward.tier, Reward.points_required)
+    )
+    return result.scalars().all()
+
+@api_router.post("/admin/rewards", response_model=AdminRewardItem)
+async def create_reward(input: RewardCreate, store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
+    await ensure_store(db, store_id)
+    reward = Reward(
+        id=input.id or generate_uuid(),
+        store_id=store_id,
+        name=input.name,
+        description=input.description,
+        points_required=input.points_required,
+        tier=input.tier,
+        image_url=input.image_url,
+        stock=input.stock,
+        updated_at=datetime.now(timezone.utc),
+    )
+    if await db.get(Reward, reward.id):
+        raise HTTPException(status_code=400, detail="Reward with this id already exists")
+    db.add(reward)
+    await db.commit()
+    catalog_cache.invalidate(store_id)
+    return reward
+
+@api_router.put("/admin/rewards/{reward_id}", response_model=AdminRewardItem)
+async def update_reward(
+    reward_id: str,
+    input: RewardUpdate,
+    store_id: str = Depends(get_store_id),
+    db: AsyncSession = Depends(get_db),
+):
+    reward = await get_store_reward(db, store_id, reward_id)
+    for key, value in input.model_dump(exclude_unset=True).items():
+        # An explicit null clears the stock limit; other fields ignore nulls
+        if value is not None or key == "stock":
+            setattr(reward, key, value)
+    reward.updated_at = datetime.now(timezone.utc)
+    await db.commit()
+    catalog_cache.invalidate(store_id)
+    return reward
+
+@api_router.delete("/admin/rewards/{reward_id}")
+async def retire_reward(reward_id: str, store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
+    # Soft delete: past redemptions and analytics still reference the row
+    reward = await get_store_reward(db, store_id, reward_id)
+    reward.active = False
+    reward.updated_at = datetime.now(timezone.utc)
+    await db.commit()
+    catalog_cache.invalidate(store_id)
+    return {"success": True, "message": "Reward retired"}
+
 @api_router.get("/redemptions", response_model=List[RedemptionResponse])
-async def get_redemptions(db: AsyncSession = Depends(get_db)):
+async def get_redemptions(store_id: str = Depends(get_store_id), db: AsyncSession = Depends(get_db)):
     result = await db.execute(
-        select(Redemption).order_by(Redemption.created_at.desc()).limit(500)
+        select(Redemption)
+        .where(Redemption.store_id == store_id)
+        .order_by(Redemption.created_at.desc())
+        .limit(500)
     )
     redemptions = result.scalars().all()
     return redemptions
 
 @api_router.get("/redemptions/user/{user_id}", response_model=List[RedemptionResponse])
-async def get_user_redemptions(user_id: str, db: AsyncSession = Depends(get_db)):
+async def get_user_redemptions(user_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    # Redeeming and claiming both bump the owner's version, so it also tags this list
+    row = await get_user_version(db, user_id)
+    if row is not None:
+        etag = f'"{row.version}"'
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
     result = await db.execute(
         select(Redemption)
         .where(Redemption.user_id == user_id)
@@ -404,23 +938,116 @@ async def mark_claimed(input: MarkClaimedRequest, db: AsyncSession = Depends(get
         raise HTTPException(status_code=404, detail="Redemption not found")
     redemption.claimed = True
     redemption.claimed_at = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(User)
+        .where(User.id == redemption.user_id)
+        .values(version=User.version + 1)
+        .returning(*CACHED_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    owner = result.one_or_none()
     await db.commit()
+    if owner is not None:
+        user_cache.put(owner)
     return {"success": True, "message": "Redemption marked as claimed"}
 
+# ==================== CHANGE FEED ====================
+
+CHANGE_FEEDS = {"users": User, "transactions": PointTransaction, "redemptions": Redemption}
+
+# Every transaction below the snapshot's xmin has ended, and any that writes
+# later gets a higher xid, so no row can still appear below this horizon once
+# it has been read. Rows of transactions still running, and of everything that
+# started after the oldest of them, wait for a later poll.
+CHANGE_HORIZON = select(literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+
+def parse_change_cursor(cursor: str) -> Tuple[int, int]:
+    # "<change_xid>.<change_seq>" of the last change returned; "0" starts from the beginning
+    xid, _, seq = cursor.partition(".")
+    try:
+        return int(xid), int(seq or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def change_feed_query(model, store_id: str, after: Tuple[int, int], horizon: int, user_id: Optional[str], limit: int):
+    # Walks ix_<table>_store_change_xid, or ix_<table>_user_change_xid for one customer
+    position = tuple_(model.change_xid, model.change_seq)
+    conditions = [model.store_id == store_id, position > tuple_(*after), model.change_xid < horizon]
+    if user_id is not None:
+        conditions.append((model.id if model is User else model.user_id) == user_id)
+    return (
+        select(model)
+        .where(*conditions)
+        .order_by(model.change_xid, model.change_seq)
+        .limit(limit)
+    )
+
+@api_router.get("/changes", response_model=ChangesResponse)
+async def get_changes(
+    since: str = "0",
+    user_id: Optional[str] = None,
+    limit: int = CHANGES_PAGE_SIZE,
+    store_id: str = Depends(get_store_id),
+    db: AsyncSession = Depends(get_db),
+):
+    # Users, transactions and redemptions changed after `since`, in
+    # (change_xid, change_seq) order; pass the returned cursor back as
+    # `since` on the next poll.
+    after = parse_change_cursor(since)
+    limit = max(1, min(limit, CHANGES_PAGE_SIZE))
+    horizon = (await db.execute(CHANGE_HORIZON)).scalar_one()
+    changes = []
+    for key, model in CHANGE_FEEDS.items():
+        result = await db.execute(change_feed_query(model, store_id, after, horizon, user_id, limit + 1))
+        changes.extend(((row.change_xid, row.change_seq), key, row) for row in result.scalars())
+    # Each table contributed its first limit + 1 rows, so no earlier row can be missing
+    changes.sort(key=lambda change: change[0])
+    page = changes[:limit]
+
+    now = datetime.now(timezone.utc)
+    grouped = {key: [] for key in CHANGE_FEEDS}
+    for _, key, row in page:
+        grouped[key].append(row)
+    last = page[-1][0] if page else after
+    return ChangesResponse(
+        users=[UserResponse(**user_payload(u, now)) for u in grouped["users"]],
+        transactions=[PointTransactionResponse.model_validate(t) for t in grouped["transactions"]],
+        redemptions=[RedemptionResponse.model_validate(r) for r in grouped["redemptions"]],
+        cursor=f"{last[0]}.{last[1]}",
+        has_more=len(changes) > limit,
+    )
+
 # ==================== LEADERBOARD ====================
 
+def competition_ranks(scores):
+    # Scores in descending order from the top. Ties share a rank and the next
+    # distinct score skips past them (1, 2, 2, 4), as user_rank_expr counts.
+    rank, previous = 0, None
+    for idx, score in enumerate(scores):
+        if score != previous:
+            rank, previous = idx + 1, score
+        yield rank
+
 @api_router.get("/leaderboard")
-async def get_leaderboard(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(User).order_by(User.lifetime_points.desc()).limit(50)
-    )
-    users = result.scalars().all()
+@single_flight(as_json=True)
+async def get_leaderboard(
+    period: Optional[str] = None,
+    store_id: str = Depends(get_store_id),
+):
+    if period is not None:
+        return await get_period_leaderboard(store_id, period)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(User.id, User.name, User.current_points, User.lifetime_points, User.points_expiry)
+            .where(User.store_id == store_id).order_by(User.lifetime_points.desc()).limit(50)
+        )
+    rows = result.all()
     now = datetime.now(timezone.utc)
     leaderboard = []
-    for idx, user in enumerate(users):
+    for user, rank in zip(rows, competition_ranks(r.lifetime_points for r in rows)):
         expired = user.points_expiry and user.points_expiry < now
         leaderboard.append({
-            "rank": idx + 1,
+            "rank": rank,
             "name": user.name,
             "lifetime_points": user.lifetime_points,
             "current_points": 0 if expired else user.current_points,
@@ -428,8 +1055,63 @@ async def get_leaderboard(db: AsyncSession = Depends(get_db)):
         })
     return leaderboard
 
+async def get_period_leaderboard(store_id: str, period: str):
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(PERIODS)}")
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(
+                User.id, User.name, User.current_points, User.lifetime_points, User.points_expiry,
+                UserPeriodPoints.points.label("period_points"),
+            )
+            .join(UserPeriodPoints, UserPeriodPoints.user_id == User.id)
+            .where(
+                UserPeriodPoints.store_id == store_id,
+                UserPeriodPoints.period == period,
+                UserPeriodPoints.period_start == period_start(period, now),
+            )
+            .order_by(UserPeriodPoints.points.desc())
+            .limit(50)
+        )
+    rows = result.all()
+    leaderboard = []
+    for user, rank in zip(rows, competition_ranks(r.period_points for r in rows)):
+        expired = user.points_expiry and user.points_expiry < now
+        leaderboard.append({
+            "rank": rank,
+            "name": user.name,
+            "period_points": user.period_points,
+            "lifetime_points": user.lifetime_points,
+            "current_points": 0 if expired else user.current_points,
+            "user_id": user.id
+        })
+    return leaderboard
+
 app.include_router(api_router)
 
+# Innermost, so an inline profile still gets CORS headers and compression
+if os.environ.get('PROFILING_ENABLED') == '1':
+    from profiling import ProfilingMiddleware  # only loaded when enabled
+    app.add_middleware(
+        ProfilingMiddleware,
+        password=ADMIN_PASSWORD,
+        profile_dir=os.environ.get('PROFILE_DIR', 'profiles'),
+        sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+        max_files=int(os.environ.get('PROFILE_MAX_FILES', '100')),
+    )
+
+if os.environ.get('SQL_INSTRUMENTATION') == '1' and engine is not None:
+    instrument_engine(engine.sync_engine)
+    app.add_middleware(QueryStatsMiddleware)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=GZIP_LEVEL,
+    brotli_quality=BROTLI_QUALITY,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -442,4 +1124,3 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
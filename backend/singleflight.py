@@ -0,0 +1,68 @@
+import asyncio
+import functools
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+
+from serialization import encode_json
+
+# Per-request objects never form part of a call's identity
+_UNKEYED = (Request, Response)
+
+_in_flight: dict = {}
+
+def _call_key(func, args, kwargs):
+    if any(isinstance(v, AsyncSession) for v in (*args, *kwargs.values())):
+        # The first caller's session would be shared, and closed under the
+        # others if that request went away; open one inside the function
+        raise TypeError(f"{func.__qualname__} must open its own session to be single-flight")
+    key = (
+        func.__module__,
+        func.__qualname__,
+        tuple(a for a in args if not isinstance(a, _UNKEYED)),
+        tuple(sorted((k, v) for k, v in kwargs.items() if not isinstance(v, _UNKEYED))),
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def single_flight(func=None, *, as_json: bool = False):
+    # Concurrent calls with equal arguments share one execution (and so one
+    # DB query): the first caller runs it and the rest await its result or
+    # exception. The caller's request/response are left out of the key, so
+    # only use this where the result depends on nothing else. The function
+    # must open its own AsyncSessionLocal() session rather than take the
+    # request's, which belongs to whichever caller started the call. Sharing
+    # ends when the call finishes; this is not a cache.
+    #
+    # With as_json=True on a route, the result is encoded once and each
+    # caller gets its own Response around the shared bytes. Response objects
+    # are never shared, because middleware mutates their headers in place.
+    def decorate(func):
+        async def run(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            return encode_json(result) if as_json else result
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = _call_key(func, args, kwargs)
+            if key is None:
+                result = await run(*args, **kwargs)
+            else:
+                task = _in_flight.get(key)
+                if task is None:
+                    task = asyncio.ensure_future(run(*args, **kwargs))
+                    _in_flight[key] = task
+                    task.add_done_callback(lambda _: _in_flight.pop(key, None))
+                # A waiter that gives up must not cancel the call for the others
+                result = await asyncio.shield(task)
+            if as_json:
+                return Response(content=result, media_type="application/json")
+            return result
+
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
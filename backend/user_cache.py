@@ -0,0 +1,68 @@
+import time
+from collections import OrderedDict, namedtuple
+from typing import Optional
+
+from models import User
+from serialization import USER_COLUMNS
+
+# A profile plus the version its ETag is built from
+CACHED_COLUMNS = USER_COLUMNS + (User.version,)
+
+CachedUser = namedtuple("CachedUser", [c.key for c in CACHED_COLUMNS])
+
+def snapshot(user) -> CachedUser:
+    # From a User or a row of CACHED_COLUMNS; immutable, so every request can share it
+    return CachedUser(*(getattr(user, c.key) for c in CACHED_COLUMNS))
+
+class UserCache:
+    # Bounded LRU of committed user rows for GET /users/{id}. The routes that
+    # move points write the new row through after they commit. Writes from
+    # other workers are not seen here, so entries also expire after `ttl`
+    # seconds. Expiry is judged at read time, so a cached row never serves a
+    # balance that has lapsed since it was stored.
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[CachedUser]:
+        entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+        if entry is not None:
+            del self._entries[user_id]
+        self.misses += 1
+        return None
+
+    def put(self, user) -> CachedUser:
+        cached = snapshot(user)
+        if self.max_size <= 0:
+            return cached
+        current = self._entries.get(cached.id)
+        # version only grows, so a read that raced a write cannot replace the newer row
+        if current is not None and current[0].version > cached.version:
+            return current[0]
+        self._entries[cached.id] = (cached, time.monotonic())
+        self._entries.move_to_end(cached.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_id: str) -> None:
+        self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -1,8 +1,14 @@
 import React from "react";
 import ReactDOM from "react-dom/client";
+import axios from "axios";
 import "@/index.css";
 import App from "@/App";
 
+// Each store's deployment sets its id; without it the API uses the default store
+if (process.env.REACT_APP_STORE_ID) {
+  axios.defaults.headers.common["X-Store-Id"] = process.env.REACT_APP_STORE_ID;
+}
+
 const root = ReactDOM.createRoot(document.getElementById("root"));
 root.render(
   <React.StrictMode>
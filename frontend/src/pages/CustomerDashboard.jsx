@@ -27,6 +27,7 @@ function getExpiryInfo(points_expiry, points_expired, current_points) {
 export default function CustomerDashboard() {
   const [user, setUser] = useState(null);
   const [redemptions, setRedemptions] = useState([]);
+  const [rank, setRank] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
   const navigate = useNavigate();
 
@@ -38,11 +39,13 @@ export default function CustomerDashboard() {
     }
     const userData = JSON.parse(storedUser);
 
-    const loadUserData = async (userId) => {
+    const loadDashboard = async (userId) => {
       try {
-        const response = await axios.get(`${API}/users/${userId}`);
-        setUser(response.data);
-        localStorage.setItem("user", JSON.stringify(response.data));
+        const response = await axios.get(`${API}/users/${userId}/dashboard`);
+        setUser(response.data.user);
+        setRank(response.data.rank);
+        setRedemptions(response.data.redemptions);
+        localStorage.setItem("user", JSON.stringify(response.data.user));
       } catch (error) {
         toast.error("Failed to load user data");
         navigate("/");
@@ -51,17 +54,7 @@ export default function CustomerDashboard() {
       }
     };
 
-    const loadRedemptions = async (userId) => {
-      try {
-        const response = await axios.get(`${API}/redemptions/user/${userId}`);
-        setRedemptions(response.data.slice(0, 3));
-      } catch (error) {
-        console.error("Failed to load redemptions");
-      }
-    };
-
-    loadUserData(userData.id);
-    loadRedemptions(userData.id);
+    loadDashboard(userData.id);
   }, [navigate]);
 
   const handleLogout = () => {
@@ -128,6 +121,7 @@ export default function CustomerDashboard() {
 
               <p className="text-amber-500 text-sm mt-2">
                 Lifetime: {user?.lifetime_points || 0} points
+                {rank && <span data-testid="user-rank"> · Rank #{rank}</span>}
               </p>
             </div>
 
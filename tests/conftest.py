@@ -0,0 +1,61 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+import pytest
+import pytest_asyncio
+
+# These tests run the app against a local Postgres with the migrations applied:
+#     pip install -r tests/requirements.txt
+#     TEST_DATABASE_URL=postgresql://localhost/waffle_test python -m pytest tests
+# Without TEST_DATABASE_URL they are skipped, except under CI, where that is
+# an error. They write customers, rewards and ledger rows to the `main` store.
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL and (urlparse(TEST_DATABASE_URL).hostname or "localhost") not in ("localhost", "127.0.0.1", "::1"):
+    raise pytest.UsageError("TEST_DATABASE_URL must point at a local database; the tests write to it")
+if not TEST_DATABASE_URL and os.environ.get("CI"):
+    raise pytest.UsageError("TEST_DATABASE_URL is not set")
+
+# Set before the app is imported; empty keeps a DATABASE_URL from backend/.env out of reach
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL or ""
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from database import engine  # noqa: E402
+from query_stats import instrument_engine  # noqa: E402
+
+if engine is not None:
+    instrument_engine(engine.sync_engine)
+
+def pytest_collection_modifyitems(config, items):
+    if not TEST_DATABASE_URL:
+        skip = pytest.mark.skip(reason="TEST_DATABASE_URL is not set")
+        for item in items:
+            item.add_marker(skip)
+
+@pytest_asyncio.fixture
+async def client():
+    # ASGITransport runs the app in the test's task, so assert_max_queries sees its statements
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    # Each test has its own event loop; pooled connections can't outlive it
+    await engine.dispose()
+
+@pytest.fixture
+def make_customer(client):
+    async def make(points: int = 1000, name: Optional[str] = None) -> str:
+        name = name or f"Test {uuid.uuid4().hex[:12]}"
+        response = await client.post("/api/admin/create-user", json={"name": name, "points": points})
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return make
+
+@pytest_asyncio.fixture
+async def customer(make_customer) -> str:
+    return await make_customer()
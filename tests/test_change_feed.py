@@ -0,0 +1,37 @@
+import uuid
+
+import pytest
+from sqlalchemy import insert
+
+from database import engine
+from models import PointTransaction
+
+pytestmark = pytest.mark.asyncio
+
+async def changes(client, customer, since="0"):
+    response = await client.get("/api/changes", params={"since": since, "user_id": customer})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def ledger_row(customer, reason):
+    return insert(PointTransaction).values(
+        id=str(uuid.uuid4()), user_id=customer, user_name="Test", points=1, reason=reason, transaction_type="earned",
+    )
+
+async def test_changes_wait_for_late_commit(client, customer):
+    cursor = (await changes(client, customer))["cursor"]
+    # The slow transaction takes the lower change_seq but commits last
+    async with engine.connect() as slow:
+        await slow.execute(ledger_row(customer, "slow"))
+        async with engine.begin() as fast:
+            await fast.execute(ledger_row(customer, "fast"))
+        page = await changes(client, customer, cursor)
+        assert page["transactions"] == []
+        cursor = page["cursor"]
+        await slow.commit()
+    page = await changes(client, customer, cursor)
+    assert [t["reason"] for t in page["transactions"]] == ["slow", "fast"]
+
+async def test_changes_rejects_bad_cursor(client, customer):
+    response = await client.get("/api/changes", params={"since": "not-a-cursor"})
+    assert response.status_code == 400
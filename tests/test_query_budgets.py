@@ -0,0 +1,53 @@
+import uuid
+
+import pytest
+
+import server
+from query_stats import assert_max_queries
+
+# Statement budgets for the hot endpoints, so an added round trip fails the run
+
+pytestmark = pytest.mark.asyncio
+
+async def test_get_user_budget(client, customer):
+    server.user_cache.invalidate(customer)
+    with assert_max_queries(1):
+        assert (await client.get(f"/api/users/{customer}")).status_code == 200
+    with assert_max_queries(0):
+        assert (await client.get(f"/api/users/{customer}")).status_code == 200
+
+async def test_dashboard_budget(client, customer):
+    with assert_max_queries(2):
+        assert (await client.get(f"/api/users/{customer}/dashboard")).status_code == 200
+
+async def test_add_points_budget(client, customer):
+    # user read, rollup upsert, user update, ledger insert, refresh
+    with assert_max_queries(5):
+        response = await client.post(
+            "/api/admin/add-points", json={"user_id": customer, "points": 50, "reason": "Purchase"}
+        )
+    assert response.status_code == 200, response.text
+
+async def test_redeem_budget(client, customer):
+    rewards = (await client.get("/api/rewards")).json()  # fills the catalog cache
+    reward = next(r for r in rewards if r["stock"] is None and r["points_required"] <= 1000)
+    # user read, reward re-read (no lock for unlimited stock), balance update,
+    # redemption and ledger inserts
+    with assert_max_queries(5):
+        response = await client.post("/api/rewards/redeem", json={"user_id": customer, "reward_id": reward["id"]})
+    assert response.status_code == 200, response.text
+
+async def test_redeem_limited_stock_budget(client, customer):
+    created = await client.post(
+        "/api/admin/rewards",
+        json={"name": f"Limited {uuid.uuid4().hex[:8]}", "points_required": 100, "tier": 9, "stock": 3},
+    )
+    assert created.status_code == 200, created.text
+    reward_id = created.json()["id"]
+    await client.get("/api/rewards")
+    # user read, stock update, balance update, redemption and ledger inserts
+    with assert_max_queries(5):
+        response = await client.post("/api/rewards/redeem", json={"user_id": customer, "reward_id": reward_id})
+    assert response.status_code == 200, response.text
+    rewards = (await client.get("/api/rewards")).json()
+    assert next(r for r in rewards if r["id"] == reward_id)["stock"] == 2
@@ -0,0 +1,31 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select
+
+from database import AsyncSessionLocal, engine
+from models import DailyStats, PointTransaction
+from rollups import run_daily_rollups
+
+pytestmark = pytest.mark.asyncio
+
+async def issued_on(day) -> int:
+    async with AsyncSessionLocal() as session:
+        await run_daily_rollups(session)
+        result = await session.execute(
+            select(DailyStats.points_issued).where(DailyStats.store_id == "main", DailyStats.day == day)
+        )
+        return result.scalar_one_or_none() or 0
+
+async def test_daily_rollup_counts_late_commit(client, customer):
+    stamped = datetime.now(timezone.utc) - timedelta(minutes=10)
+    before = await issued_on(stamped.date())
+    # Stamped before the run above, committed after it
+    async with engine.begin() as conn:
+        await conn.execute(insert(PointTransaction).values(
+            id=str(uuid.uuid4()), user_id=customer, user_name="Test", points=7, reason="late",
+            transaction_type="earned", created_at=stamped,
+        ))
+    assert await issued_on(stamped.date()) == before + 7
+    assert await issued_on(stamped.date()) == before + 7  # recomputed, not added again
@@ -0,0 +1,36 @@
+import io
+import csv
+import uuid
+import asyncio
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.asyncio
+
+async def test_single_flight_survives_cancelled_caller(client, customer):
+    server.user_cache.invalidate(customer)
+    first = asyncio.ensure_future(server.load_cached_user(customer))
+    second = asyncio.ensure_future(server.load_cached_user(customer))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert (await second).id == customer
+
+async def test_leaderboard_ranks_ties_like_dashboard(client, make_customer):
+    # Above anything the other tests create, so the pair tops the store
+    for _ in range(2):
+        user_id = await make_customer(points=1_000_000)
+        assert (await client.get(f"/api/users/{user_id}/rank")).json()["rank"] == 1
+    leaderboard = (await client.get("/api/leaderboard")).json()
+    assert [entry["rank"] for entry in leaderboard[:2]] == [1, 1]
+    for entry in leaderboard:
+        rank = (await client.get(f"/api/users/{entry['user_id']}/rank")).json()["rank"]
+        assert entry["rank"] == rank
+
+async def test_expiring_export_neutralises_formulas(client, make_customer):
+    name = f"=HYPERLINK(\"http://example.com\") {uuid.uuid4().hex[:8]}"
+    await make_customer(points=10, name=name)
+    export = await client.get("/api/admin/expiring/export", params={"within_days": 365})
+    rows = list(csv.reader(io.StringIO(export.text)))
+    assert ["'" + name] in [row[1:2] for row in rows]